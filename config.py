@@ -1,29 +1,70 @@
 import os
-from dotenv import load_dotenv
+from dataclasses import dataclass, field
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping, Optional, Tuple
 
-# Load environment variables from .env file
-load_dotenv()
+# Load environment variables from .env file. In production the platform
+# (Cloud Run) injects them, so the file is not even parsed and python-dotenv
+# is not installed (see requirements-dev.txt).
+if os.environ.get("ENVIRONMENT", "development") != "production":
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        load_dotenv = None
+    if load_dotenv is not None:
+        # Variables already set by the platform win over the .env file
+        load_dotenv(override=False)
 
+# Snapshot of the environment taken once, after .env has been applied.
+# Nothing below reads os.environ again.
+_ENV = dict(os.environ)
+
+def _env(key: str, default=None, cast=str):
+    """
+    Read a value from the environment snapshot, casting it when present
+    A value that cannot be cast fails at startup, naming the variable.
+    """
+    value = _ENV.get(key)
+    if value is None:
+        return default
+    try:
+        return cast(value)
+    except ValueError as e:
+        raise RuntimeError(f"Invalid value for {key}: {value!r} ({e})") from e
+
+# First-party frontends, always allowed in production
+PRODUCTION_ORIGINS = (
+    "https://www.auravisual.dk",
+    "https://app.auravisual.dk",
+    "https://client.auravisual.dk"
+)
+
+@dataclass(frozen=True, slots=True)
 class Settings:
     """
     Application settings configuration
-    This class loads configuration from environment variables
-    and provides default values.
+    Values are read from environment variables once at import time
+    (see get_settings) and frozen afterwards.
     """
     
     # Environment configuration
-    environment: str = os.getenv("ENVIRONMENT", "development")
-    debug: bool = environment == "development"
+    environment: str = "development"
     
     # Supabase configuration
-    supabase_url: str = os.getenv("SUPABASE_URL")
-    supabase_key: str = os.getenv("SUPABASE_KEY")
-    supabase_service_key: str = os.getenv("SUPABASE_SERVICE_KEY")
+    supabase_url: Optional[str] = None
+    supabase_key: Optional[str] = None
+    supabase_service_key: Optional[str] = None
+    supabase_max_connections: int = 60  # Per HTTP pool (sync SDK pool, async PostgREST pool)
+    supabase_max_keepalive_connections: int = 40
+    supabase_db_url: Optional[str] = None  # Direct Postgres DSN for asyncpg reads (optional)
+    db_pool_min_size: int = 1
+    db_pool_max_size: int = 10
     
     # JWT configuration
-    secret_key: str = os.getenv("SECRET_KEY")
-    algorithm: str = os.getenv("ALGORITHM", "HS256")
-    access_token_expire_minutes: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+    secret_key: Optional[str] = None
+    algorithm: str = "HS256"
+    access_token_expire_minutes: int = 30
     
     # API configuration
     project_name: str = "Auravisual Collab Manager API"
@@ -32,91 +73,167 @@ class Settings:
     
     # Server configuration
     host: str = "0.0.0.0"
-    port: int = 8000
-    
-    @property
-    def docs_url(self):
-        """Enable API docs only in development"""
-        return "/docs" if self.debug else None
+    port: int = 8000  # Cloud Run sets PORT
     
-    @property
-    def redoc_url(self):
-        """Enable ReDoc only in development"""
-        return "/redoc" if self.debug else None
+    # Derived values, computed once in __post_init__
+    debug: bool = field(init=False)
+    docs_url: Optional[str] = field(init=False)  # API docs only in development
+    redoc_url: Optional[str] = field(init=False)  # ReDoc only in development
+    openapi_url: Optional[str] = field(init=False)  # OpenAPI JSON only in development
+    cors_origins: Tuple[str, ...] = field(init=False)
+    reload: bool = field(init=False)  # Uvicorn auto-reload in development
+    log_level: str = field(init=False)
     
-    @property
-    def openapi_url(self):
-        """Enable OpenAPI JSON only in development"""
-        return "/openapi.json" if self.debug else None
+    def __post_init__(self):
+        debug = self.environment == "development"
+        # Frozen dataclass: derived fields must bypass __setattr__
+        object.__setattr__(self, "debug", debug)
+        object.__setattr__(self, "docs_url", "/docs" if debug else None)
+        object.__setattr__(self, "redoc_url", "/redoc" if debug else None)
+        object.__setattr__(self, "openapi_url", "/openapi.json" if debug else None)
+        object.__setattr__(self, "cors_origins", self._build_cors_origins(debug))
+        object.__setattr__(self, "reload", debug)
+        object.__setattr__(self, "log_level", "debug" if debug else "info")
     
-    @property
-    def cors_origins(self):
-        """Get CORS origins based on environment"""
-        if self.debug:
+    @staticmethod
+    def _build_cors_origins(debug: bool) -> Tuple[str, ...]:
+        """Get CORS origins based on environment (evaluated once per process)"""
+        if debug:
             # Even in dev, be more restrictive
-            return [
+            return (
                 "http://localhost:3000",
                 "http://127.0.0.1:3000",
                 "http://localhost:8080",  # Flutter web dev
                 "http://127.0.0.1:8080"
-            ]
+            )
         
-        # In production, get from environment variable
-        allowed_origins = os.getenv("ALLOWED_ORIGINS", "")
-        if allowed_origins:
-            origins = [origin.strip() for origin in allowed_origins.split(",") if origin.strip()]
-            return list(set(origins))
+        # In production, origins from the environment plus our own domains
+        allowed_origins = _env("ALLOWED_ORIGINS", "")
+        origins = tuple(filter(None, (origin.strip() for origin in allowed_origins.split(","))))
+        
+        # Browsers send scheme://host[:port] with no path; anything else never
+        # matches, so reject it at startup rather than failing CORS silently
+        invalid = [o for o in origins if not o.startswith(("https://", "http://")) or o.endswith("/")]
+        if invalid:
+            raise RuntimeError(f"Invalid value for ALLOWED_ORIGINS: {invalid} (expected scheme://host without trailing slash)")
+        
+        return tuple(dict.fromkeys((*origins, *PRODUCTION_ORIGINS)))
+
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """
+    Return the process-wide Settings instance
+    The environment is read on the first call only; later calls (and
+    FastAPI dependencies using this function) get the same object.
+    """
+    return Settings(
+        environment=_env("ENVIRONMENT", "development"),
+        supabase_url=_env("SUPABASE_URL"),
+        supabase_key=_env("SUPABASE_KEY"),
+        supabase_service_key=_env("SUPABASE_SERVICE_KEY"),
+        supabase_max_connections=_env("SUPABASE_MAX_CONNECTIONS", 60, cast=int),
+        supabase_max_keepalive_connections=_env("SUPABASE_MAX_KEEPALIVE_CONNECTIONS", 40, cast=int),
+        supabase_db_url=_env("SUPABASE_DB_URL"),
+        db_pool_min_size=_env("DB_POOL_MIN_SIZE", 1, cast=int),
+        db_pool_max_size=_env("DB_POOL_MAX_SIZE", 10, cast=int),
+        secret_key=_env("SECRET_KEY"),
+        algorithm=_env("ALGORITHM", "HS256"),
+        access_token_expire_minutes=_env("ACCESS_TOKEN_EXPIRE_MINUTES", 30, cast=int),
+        port=_env("PORT", 8000, cast=int),
+    )
+
+settings = get_settings()
 
-settings = Settings()
+# Fail fast on missing credentials instead of erroring inside a request
+REQUIRED_SETTINGS = ("supabase_url", "supabase_key", "supabase_service_key", "secret_key")
+_missing = [name for name in REQUIRED_SETTINGS if not getattr(settings, name)]
+if _missing and not settings.debug:
+    raise RuntimeError(f"Missing required environment variables: {[name.upper() for name in _missing]}")
+
+# HTTP methods accepted by CORS in each environment
+_METHODS_DEV = ("*",)
+_METHODS_PROD = ("GET", "POST", "PUT", "DELETE", "OPTIONS")
+
+# Configuration mappings, built once and shared read-only by every caller
+_APP_CONFIG = MappingProxyType({
+    "title": settings.project_name,
+    "description": settings.project_description,
+    "version": settings.project_version,
+    "docs_url": settings.docs_url,
+    "redoc_url": settings.redoc_url,
+    "openapi_url": settings.openapi_url
+})
+
+_CORS_CONFIG = MappingProxyType({
+    "allow_origins": settings.cors_origins,
+    "allow_credentials": True,
+    "allow_methods": _METHODS_DEV if settings.debug else _METHODS_PROD,
+    "allow_headers": ("*",)
+})
+
+_SERVER_CONFIG = MappingProxyType({
+    "host": settings.host,
+    "port": settings.port,
+    "reload": settings.reload,
+    "log_level": settings.log_level,
+    # libuv event loop and C HTTP parser in production; "auto" in development
+    # so the server still starts where uvloop is unavailable (Windows)
+    "loop": "auto" if settings.debug else "uvloop",
+    "http": "auto" if settings.debug else "httptools",
+    # Per-request access log lines only in development
+    "access_log": settings.debug
+})
+
+_SUPABASE_CONFIG = MappingProxyType({
+    "url": settings.supabase_url,
+    "key": settings.supabase_key
+})
+
+_SUPABASE_ADMIN_CONFIG = MappingProxyType({
+    "url": settings.supabase_url,
+    "key": settings.supabase_service_key
+})
+
+# Limits and timeouts shared by every HTTP pool talking to Supabase
+_SUPABASE_HTTP_CONFIG = MappingProxyType({
+    "max_connections": settings.supabase_max_connections,
+    "max_keepalive_connections": settings.supabase_max_keepalive_connections,
+    "keepalive_expiry": 60,
+    "timeout": 30.0,
+    "connect_timeout": 5.0
+})
+
+_JWT_CONFIG = MappingProxyType({
+    "secret_key": settings.secret_key,
+    "algorithm": settings.algorithm,
+    "expire_minutes": settings.access_token_expire_minutes
+})
 
 # Helper functions for configuration
-def get_app_config() -> dict:
+def get_app_config() -> Mapping:
     """Get FastAPI application configuration"""
-    return {
-        "title": settings.project_name,
-        "description": settings.project_description,
-        "version": settings.project_version,
-        "docs_url": settings.docs_url,
-        "redoc_url": settings.redoc_url,
-        "openapi_url": settings.openapi_url
-    }
-
-def get_cors_config() -> dict:
+    return _APP_CONFIG
+
+def get_cors_config() -> Mapping:
     """Get CORS middleware configuration"""
-    return {
-        "allow_origins": settings.cors_origins,
-        "allow_credentials": True,
-        "allow_methods": ["*"] if settings.debug else ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["*"]
-    }
-
-def get_server_config() -> dict:
+    return _CORS_CONFIG
+
+def get_server_config() -> Mapping:
     """Get Uvicorn server configuration"""
-    return {
-        "host": settings.host,
-        "port": int(os.getenv("PORT", settings.port)),  # Cloud Run sets PORT
-        "reload": settings.debug,
-        "log_level": "debug" if settings.debug else "info"
-    }
-
-def get_supabase_config() -> dict:
+    return _SERVER_CONFIG
+
+def get_supabase_config() -> Mapping:
     """Get Supabase client configuration"""
-    return {
-        "url": settings.supabase_url,
-        "key": settings.supabase_key
-    }
+    return _SUPABASE_CONFIG
 
-def get_supabase_admin_config() -> dict:
+def get_supabase_admin_config() -> Mapping:
     """Get Supabase admin configuration"""
-    return {
-        "url": settings.supabase_url,
-        "key": settings.supabase_service_key
-    }
+    return _SUPABASE_ADMIN_CONFIG
+
+def get_supabase_http_config() -> Mapping:
+    """Get Supabase HTTP pool limits and timeouts"""
+    return _SUPABASE_HTTP_CONFIG
 
-def get_jwt_config() -> dict:
+def get_jwt_config() -> Mapping:
     """Get JWT configuration"""
-    return {
-        "secret_key": settings.secret_key,
-        "algorithm": settings.algorithm,
-        "expire_minutes": settings.access_token_expire_minutes
-    }
+    return _JWT_CONFIG
@@ -1,50 +1,194 @@
-from supabase import create_client, Client
-from config import settings, get_supabase_config, get_supabase_admin_config
-from typing import Optional, Dict, List
+from supabase import create_client, Client, ClientOptions
+from config import settings, get_supabase_config, get_supabase_admin_config, get_supabase_http_config
+from typing import Optional, Dict, List, Tuple
+from collections import defaultdict
+from datetime import datetime
+from functools import lru_cache
+import asyncio
+import httpx
 import logging
+from utils.cache import async_ttl_cache, coalesce_calls, Uncached
+from db_pool import fetch_json
+from rest_client import rest_select, close_rest_client
 
 # Setup logging
 logger = logging.getLogger(__name__)
 
-# Global Supabase clients
-supabase_client: Optional[Client] = None
-supabase_admin_client: Optional[Client] = None
-
+# Column projections used instead of select("*"). tasks.time_logs is left out
+# on purpose: it grows with every timer session and only the time tracking
+# helpers read it.
+USER_COLUMNS = "id, email, username, full_name, role, is_active, email_verified, created_at"
+PROJECT_COLUMNS = "id, name, description, status, plan, client_id, website_url, social_links, contract_subscription_date, created_at, updated_at"
+TICKET_COLUMNS = "id, project_id, client_id, message, status, created_at, updated_at"
+TASK_COLUMNS = "id, ticket_id, assigned_to, action, priority, status, total_time_minutes, time_sessions_count, created_at, updated_at"
+
+_VALID_PRIORITIES = frozenset(("low", "medium", "high", "urgent"))
+_VALID_PRIORITIES_LIST = sorted(_VALID_PRIORITIES)
+# Ticket statuses that still need work from the team
+_OPEN_TICKET_STATUSES = ("to_read", "processing")
+# Roles allowed to read any task's time logs
+_TIME_LOG_VIEWER_ROLES = frozenset(("admin", "internal_staff"))
+
+# HTTP clients handed to Supabase clients, closed by close_clients() on shutdown
+_http_clients: List[httpx.Client] = []
+
+@lru_cache(maxsize=1)
+def _get_http_transport() -> httpx.HTTPTransport:
+    """
+    Connection pool shared by every Supabase client in the process
+    Keep-alive HTTP/2 connections are reused across queries, so only the
+    first request of a connection pays the TCP/TLS handshake.
+    """
+    http_config = get_supabase_http_config()
+    return httpx.HTTPTransport(
+        http2=True,
+        retries=3,  # Connection failures only
+        limits=httpx.Limits(
+            max_connections=http_config["max_connections"],
+            max_keepalive_connections=http_config["max_keepalive_connections"],
+            keepalive_expiry=http_config["keepalive_expiry"]
+        )
+    )
+
+def _create_http_client() -> httpx.Client:
+    """Build the HTTP client used by a Supabase client, on the shared transport"""
+    http_config = get_supabase_http_config()
+    http_client = httpx.Client(
+        transport=_get_http_transport(),
+        timeout=httpx.Timeout(http_config["timeout"], connect=http_config["connect_timeout"]),
+        follow_redirects=True
+    )
+    _http_clients.append(http_client)
+    return http_client
+
+def _create_supabase_client(url: str, key: str) -> Client:
+    """Create a Supabase client on the shared connection pool"""
+    # postgrest stores the API key headers on the httpx.Client, so anon and
+    # service-role each get their own client; only the transport is shared
+    return create_client(url, key, options=ClientOptions(httpx_client=_create_http_client()))
+
+# Supabase clients are created once per process. lru_cache makes the
+# accessors cheap after the first call; a cold-start race can at worst build a
+# throwaway extra client, every caller still gets the cached one afterwards.
+@lru_cache(maxsize=1)
 def get_supabase_client() -> Client:
     """
     Get the regular Supabase client (with anon key)
     Used for standard operations with RLS policies
     """
-    global supabase_client
-    
-    if supabase_client is None:
-        config = get_supabase_config()
-        supabase_client = create_client(config["url"], config["key"])
-        logger.info("Supabase client initialized")
-    
-    return supabase_client
+    config = get_supabase_config()
+    client = _create_supabase_client(config["url"], config["key"])
+    logger.info("Supabase client initialized")
+    return client
 
+@lru_cache(maxsize=1)
 def get_supabase_admin_client() -> Client:
     """
     Get the admin Supabase client (with service role key)
     Used for admin operations that bypass RLS policies
     """
-    global supabase_admin_client
-    
-    if supabase_admin_client is None:
-        config = get_supabase_admin_config()
-        supabase_admin_client = create_client(config["url"], config["key"])
-        logger.info("Supabase admin client initialized")
-    
-    return supabase_admin_client
+    config = get_supabase_admin_config()
+    client = _create_supabase_client(config["url"], config["key"])
+    logger.info("Supabase admin client initialized")
+    return client
+
+def warm_up_clients() -> None:
+    """
+    Build both Supabase clients ahead of the first request
+    Errors are logged rather than raised so a misconfigured key still lets
+    the app start; the accessors raise again on first real use.
+    """
+    for accessor in (get_supabase_client, get_supabase_admin_client):
+        try:
+            accessor()
+        except Exception as e:
+            logger.warning(f"Could not initialize {accessor.__name__}: {str(e)}")
+
+async def close_clients() -> None:
+    """Close every Supabase HTTP pool and forget the cached clients (shutdown)"""
+    get_supabase_client.cache_clear()
+    get_supabase_admin_client.cache_clear()
+    while _http_clients:
+        _http_clients.pop().close()
+    _get_http_transport().close()
+    _get_http_transport.cache_clear()
+    # The async PostgREST reader has its own pool (see rest_client)
+    await close_rest_client()
+
+async def _execute(query):
+    """
+    Execute a Supabase query builder in a worker thread
+    supabase-py is synchronous; running .execute() off the event loop lets
+    independent queries overlap with asyncio.gather.
+    """
+    return await asyncio.to_thread(query.execute)
+
+def invalidate_cached_reads() -> None:
+    """Drop cached dashboard, project and user-list reads after a write"""
+    get_dashboard_stats.cache_clear()
+    get_all_projects_with_relations.cache_clear()
+    get_users_grouped_by_role.cache_clear()
+    count_users.cache_clear()
+    _get_first_users_page.cache_clear()
+    get_users_by_role_with_tasks.cache_clear()
+    get_users_by_role_with_projects.cache_clear()
+
+@async_ttl_cache(ttl=60, maxsize=10_000)
+async def _get_user_role(user_id: str) -> Optional[str]:
+    """
+    Role of a user for permission checks, cached for a minute
+    Roles are only changed from the Supabase dashboard, so a role change
+    takes effect here within the TTL.
+    """
+    response = await _execute(get_supabase_admin_client().from_("users").select("role").eq("id", user_id).maybe_single())
+    return response.data.get("role") if response else None
 
+def _split_cursor(cursor: str) -> Tuple[str, Optional[str]]:
+    """(created_at, id) of a "created_at|id" cursor; id is None for a bare created_at"""
+    created_at, _, last_id = cursor.partition("|")
+    return created_at, last_id or None
+
+def _cursor_filter(cursor: str) -> str:
+    """
+    PostgREST or() condition for the rows after `cursor` in (created_at, id)
+    descending order. created_at alone is not unique, so rows sharing the
+    last row's timestamp are told apart by id instead of being skipped.
+    """
+    created_at, last_id = _split_cursor(cursor)
+    # Quoted: timestamps contain ':' and '+'
+    condition = f'created_at.lt."{created_at}"'
+    if last_id:
+        condition += f',and(created_at.eq."{created_at}",id.lt.{last_id})'
+    return condition
+
+def _page(query, limit: Optional[int] = None, cursor: Optional[str] = None):
+    """
+    Apply keyset pagination to a query ordered by (created_at, id), newest first
+    `cursor` comes from next_page_cursor on the previous page; without
+    `limit` the full result is returned as before.
+    """
+    query = query.order("created_at", desc=True).order("id", desc=True)
+    if cursor:
+        query = query.or_(_cursor_filter(cursor))
+    if limit:
+        query = query.limit(limit)
+    return query
+
+def next_page_cursor(rows: List[Dict], limit: Optional[int]) -> Optional[str]:
+    """Cursor ("created_at|id" of the last row) for the page after `rows`, None when there is no further page"""
+    if not limit or len(rows) < limit:
+        return None
+    return f"{rows[-1].get('created_at')}|{rows[-1].get('id')}"
+
+@async_ttl_cache(ttl=5, maxsize=1)
 async def test_connection() -> dict:
-    """Test the database connection"""
+    """Test the database connection, reusing the result for 5 seconds"""
     try:
         client = get_supabase_client()
         
-        # Test connection with a simple query to users table
-        response = client.from_("users").select("count", count="exact").execute()
+        # Test connection with a simple query to users table; the planner
+        # estimate is enough here and HEAD skips the row payload
+        response = await _execute(client.from_("users").select("id", count="planned", head=True))
         
         return {
             "status": "connected",
@@ -57,56 +201,133 @@ async def test_connection() -> dict:
     
     except Exception as e:
         logger.error(f"Database connection failed: {str(e)}")
-        return {
+        return Uncached({
             "status": "error",
             "database": "supabase", 
             "error": str(e),
             "environment": settings.environment
-        }
+        })
 
 # User management functions
-async def get_all_users() -> List[Dict]:
-    """Get all users (admin only)"""
-    try:
-        admin_client = get_supabase_admin_client()
-        response = admin_client.from_("users").select("*").execute()
-        return response.data if response.data else []
-    except Exception as e:
-        logger.error(f"Error fetching users: {str(e)}")
-        return []
+async def _fetch_users(limit: Optional[int] = None, cursor: Optional[str] = None) -> List[Dict]:
+    """One page of users, newest first; errors are raised"""
+    created_at, last_id = _split_cursor(cursor) if cursor else (None, None)
+    # LIMIT NULL means no limit; id < NULL is never true, so a bare
+    # created_at cursor falls back to created_at < cursor
+    users = await fetch_json(f"""
+        select coalesce(json_agg(u order by u.created_at desc, u.id desc), '[]') from (
+            select {USER_COLUMNS} from users
+            where $1::text is null
+               or created_at < $1::text::timestamptz
+               or (created_at = $1::text::timestamptz and id < $3::uuid)
+            order by created_at desc, id desc
+            limit $2
+        ) u
+    """, created_at, limit, last_id)
+    # None: no pool or the pooled read failed, use PostgREST
+    if users is not None:
+        return users
 
-async def get_user_by_id(user_id: str) -> Optional[Dict]:
-    """Get user by ID"""
+    params = {"order": "created_at.desc,id.desc"}
+    if cursor:
+        params["or"] = f"({_cursor_filter(cursor)})"
+    if limit:
+        params["limit"] = str(limit)
+    users, _ = await rest_select("users", USER_COLUMNS, params)
+    return users
+
+@async_ttl_cache(ttl=30, maxsize=1)
+async def count_users() -> int:
+    """Total number of users; errors are raised"""
+    total = await fetch_json("select to_json(count(*)) from users")
+    if total is not None:
+        return total
+
+    # limit=0 returns no rows, only the count in Content-Range
+    _, total = await rest_select("users", "id", {"limit": "0"}, count=True)
+    return total
+
+@async_ttl_cache(ttl=30, maxsize=16)
+async def _get_first_users_page(limit: Optional[int] = None) -> List[Dict]:
+    """The first page of users (every user without a limit), cached per limit"""
+    return await _fetch_users(limit)
+
+async def get_all_users(limit: Optional[int] = None, cursor: Optional[str] = None) -> Tuple[int, List[Dict]]:
+    """
+    Get all users, newest first, optionally one page at a time (admin only)
+    Returns (total, users): total is the number of all users, whichever page
+    is asked for. Only the first page is cached; cursors come from clients
+    and would each leave an entry behind. Errors are raised.
+    """
+    page = _fetch_users(limit, cursor) if cursor else _get_first_users_page(limit)
+    total, users = await asyncio.gather(count_users(), page)
+    return total, users
+
+async def get_users_page(limit: int, cursor: Optional[str] = None) -> List[Dict]:
+    """
+    One page of users for streaming: not counted and not cached, so walking
+    every page neither pays for a count per page nor fills the cache with
+    one entry per cursor. Errors are raised.
+    """
+    return await _fetch_users(limit, cursor)
+
+@coalesce_calls
+async def get_user_by_id(user_id: str, client: Optional[Client] = None) -> Optional[Dict]:
+    """
+    Get user by ID (admin client unless one is passed)
+    Concurrent lookups of the same user, e.g. a burst of requests with one
+    token, share a single query. The returned dict is shared: read-only.
+    """
     try:
-        client = get_supabase_client()
-        response = client.from_("users").select("*").eq("id", user_id).single().execute()
-        return response.data if response.data else None
+        client = client or get_supabase_admin_client()
+        response = await _execute(client.from_("users").select(USER_COLUMNS).eq("id", user_id).maybe_single())
+        return response.data if response else None
     except Exception as e:
         logger.error(f"Error fetching user {user_id}: {str(e)}")
         return None
 
+@async_ttl_cache(ttl=60, maxsize=1)
+async def get_users_grouped_by_role() -> Dict[str, List[Dict]]:
+    """
+    All users split by role, oldest first, from a single query
+    The per-role listings read from this snapshot, so showing clients and
+    staff side by side costs one users query instead of one per role.
+    Errors are raised rather than returned as an empty snapshot, so the
+    callers can tell "no users" from "query failed" and nothing is cached.
+    """
+    users = await fetch_json(f"""
+        select coalesce(json_agg(u), '[]') from (
+            select {USER_COLUMNS} from users order by created_at
+        ) u
+    """)
+    if users is None:
+        # No pool, or the pooled read failed
+        users, _ = await rest_select("users", USER_COLUMNS, {"order": "created_at.asc"})
+    
+    grouped = defaultdict(list)
+    for user in users:
+        grouped[user.get("role")].append(user)
+    return dict(grouped)
+
 async def get_users_by_role(role: str) -> List[Dict]:
     """Get users by role (admin, internal_staff, client)"""
     try:
-        admin_client = get_supabase_admin_client()
-        response = admin_client.from_("users").select("*").eq("role", role).execute()
-        return response.data if response.data else []
+        grouped = await get_users_grouped_by_role()
+        return grouped.get(role, [])
     except Exception as e:
         logger.error(f"Error fetching users with role {role}: {str(e)}")
         return []
 
-async def get_user_task_counts(user_id: str) -> Dict:
+async def get_user_task_counts(user_id: str, client: Optional[Client] = None) -> Dict:
     """Get task counts for a specific user with status breakdown"""
     try:
-        admin_client = get_supabase_admin_client()
-        
-        # Count total tasks assigned to user
-        total_response = admin_client.from_("tasks").select("id", count="exact").eq("assigned_to", user_id).execute()
-        total_assigned = total_response.count or 0
+        admin_client = client or get_supabase_admin_client()
         
-        # Count active tasks (in_progress only)
-        active_response = admin_client.from_("tasks").select("id", count="exact").eq("assigned_to", user_id).eq("status", "in_progress").execute()
-        active_tasks = active_response.count or 0
+        # Total and active (in_progress only) tasks from one aggregate query
+        response = await _execute(admin_client.rpc("user_task_counts", {"p_user_id": user_id}))
+        counts = response.data[0] if response.data else {}
+        total_assigned = counts.get("total_assigned") or 0
+        active_tasks = counts.get("active_tasks") or 0
         
         return {
             "total_assigned": total_assigned,
@@ -121,34 +342,22 @@ async def get_user_task_counts(user_id: str) -> Dict:
         }
 
 
+@async_ttl_cache(ttl=30)
 async def get_dashboard_stats() -> Dict:
     """Get dashboard statistics for admin"""
     try:
         admin_client = get_supabase_admin_client()
         
-        # Count total projects
-        projects_response = admin_client.from_("projects").select("id", count="exact").execute()
-        total_projects = projects_response.count or 0
-        
-        # Count active projects (in_development status)
-        active_projects_response = admin_client.from_("projects").select("id", count="exact").eq("status", "in_development").execute()
-        active_projects = active_projects_response.count or 0
-        
-        # Count total clients
-        clients_response = admin_client.from_("users").select("id", count="exact").eq("role", "client").execute()
-        total_clients = clients_response.count or 0
-        
-        # Count open tickets (to_read, processing)
-        open_tickets_response = admin_client.from_("tickets").select("id", count="exact").in_("status", ["to_read", "processing"]).execute()
-        open_tickets = open_tickets_response.count or 0
+        # All counters come back from one RPC (see supabase/migrations)
+        response = await _execute(admin_client.rpc("dashboard_stats"))
+        counts = response.data or {}
         
-        # Count active tasks (in_progress)
-        active_tasks_response = admin_client.from_("tasks").select("id", count="exact").eq("status", "in_progress").execute()
-        active_tasks = active_tasks_response.count or 0
-        
-        # Count total staff
-        staff_response = admin_client.from_("users").select("id", count="exact").eq("role", "internal_staff").execute()
-        total_staff = staff_response.count or 0
+        total_projects = counts.get("projects_total") or 0
+        active_projects = counts.get("projects_active") or 0
+        total_clients = counts.get("clients_total") or 0
+        total_staff = counts.get("staff_total") or 0
+        open_tickets = counts.get("tickets_open") or 0
+        active_tasks = counts.get("tasks_active") or 0
         
         return {
             "projects": {
@@ -172,48 +381,29 @@ async def get_dashboard_stats() -> Dict:
         
     except Exception as e:
         logger.error(f"Error fetching dashboard stats: {str(e)}")
-        return {
+        return Uncached({
             "projects": {"total": 0, "active": 0, "completed": 0},
             "clients": {"total": 0},
             "staff": {"total": 0},
             "tickets": {"open": 0},
             "tasks": {"active": 0}
-        }
+        })
 
 
-async def get_tasks_by_user(user_id: str, status_filter: str = None) -> List[Dict]:
+# A user's tasks with their ticket, project and project client
+_USER_TASK_SELECT = "id, ticket_id, action, priority, status, created_at, updated_at, tickets:ticket_id(id, message, status, projects:project_id(id, name, client_id, users:client_id(full_name, email)))"
+
+async def get_tasks_by_user(user_id: str, status_filter: str = None, client: Optional[Client] = None) -> List[Dict]:
     """Get tasks assigned to a specific user with optional status filter"""
     try:
-        admin_client = get_supabase_admin_client()
+        admin_client = client or get_supabase_admin_client()
         
-        query = admin_client.from_("tasks").select("""
-            id,
-            ticket_id,
-            action,
-            priority,
-            status,
-            created_at,
-            updated_at,
-            tickets:ticket_id (
-                id,
-                message,
-                status,
-                projects:project_id (
-                    id,
-                    name,
-                    client_id,
-                    users:client_id (
-                        full_name,
-                        email
-                    )
-                )
-            )
-        """).eq("assigned_to", user_id)
+        query = admin_client.from_("tasks").select(_USER_TASK_SELECT).eq("assigned_to", user_id)
         
         if status_filter:
             query = query.eq("status", status_filter)
         
-        response = query.order("created_at", desc=True).execute()
+        response = await _execute(query.order("created_at", desc=True))
         return response.data if response.data else []
         
     except Exception as e:
@@ -226,50 +416,59 @@ async def update_task_status(task_id: str, new_status: str, user_id: str) -> Dic
     try:
         admin_client = get_supabase_admin_client()
         
-        # First verify the task exists and user has permission
-        task_check = admin_client.from_("tasks").select("assigned_to").eq("id", task_id).single().execute()
+        # Permission check (assignee or admin) and update in one statement
+        response = await _execute(admin_client.rpc("update_task_status_if_permitted", {
+            "p_task_id": task_id,
+            "p_status": new_status,
+            "p_user_id": user_id
+        }))
+        result = response.data
         
-        if not task_check.data:
-            return {"error": "Task not found"}
+        if not result:
+            return {"error": "Update failed"}
+        if "error" in result:
+            return result
         
-        # Check if user is assigned to this task or is admin
-        user_role_check = admin_client.from_("users").select("role").eq("id", user_id).single().execute()
-        user_role = user_role_check.data.get("role") if user_role_check.data else None
-        
-        if task_check.data["assigned_to"] != user_id and user_role != "admin":
-            return {"error": "Permission denied"}
-        
-        # Update task status
-        response = admin_client.from_("tasks").update({
-            "status": new_status
-        }).eq("id", task_id).execute()
-        
-        return response.data[0] if response.data else {"error": "Update failed"}
+        invalidate_cached_reads()
+        return result
         
     except Exception as e:
         logger.error(f"Error updating task status: {str(e)}")
         return {"error": str(e)}
 
-
+@async_ttl_cache(ttl=10)
 async def get_users_by_role_with_tasks(role: str) -> List[Dict]:
     """Get users by role with task counts"""
     try:
         admin_client = get_supabase_admin_client()
         
-        # Get users by role
-        response = admin_client.from_("users").select("*").eq("role", role).order("created_at").execute()
-        users = response.data if response.data else []
+        # Users from the grouped snapshot and their task counts (one grouped
+        # query) concurrently; copies, since the snapshot is shared
+        grouped, counts_response = await asyncio.gather(
+            get_users_grouped_by_role(),
+            _execute(admin_client.rpc("user_task_counts_by_role", {"p_role": role}))
+        )
+        users = [dict(user) for user in grouped.get(role, [])]
+        
+        counts_by_user = {
+            row["user_id"]: {
+                "total_assigned": row.get("total_assigned") or 0,
+                "active_tasks": row.get("active_tasks") or 0
+            }
+            for row in counts_response.data or []
+        }
         
-        # Add task counts for each user
         for user in users:
-            task_counts = await get_user_task_counts(user["id"])
-            user["task_counts"] = task_counts
+            user["task_counts"] = counts_by_user.get(user["id"]) or {
+                "total_assigned": 0,
+                "active_tasks": 0
+            }
         
         return users
         
     except Exception as e:
         logger.error(f"Error fetching users with role {role}: {str(e)}")
-        return []
+        return Uncached([])
 
 
 async def create_task(ticket_id: str, assigned_to: str, action: str, priority: str = "medium") -> Dict:
@@ -277,26 +476,22 @@ async def create_task(ticket_id: str, assigned_to: str, action: str, priority: s
     try:
         admin_client = get_supabase_admin_client()
         
-        # Validate that ticket exists
-        ticket_check = admin_client.from_("tickets").select("id").eq("id", ticket_id).single().execute()
-        if not ticket_check.data:
-            return {"error": "Ticket not found"}
-        
-        # Validate that assigned user exists
-        user_check = admin_client.from_("users").select("id").eq("id", assigned_to).single().execute()
-        if not user_check.data:
-            return {"error": "Assigned user not found"}
-        
-        task_data = {
-            "ticket_id": ticket_id,
-            "assigned_to": assigned_to,
-            "action": action,
-            "priority": priority,
-            "status": "in_progress"  # Default status
-        }
+        # Ticket/user validation and insert happen in one RPC (see supabase/migrations)
+        response = await _execute(admin_client.rpc("create_task_safe", {
+            "p_ticket_id": ticket_id,
+            "p_assigned_to": assigned_to,
+            "p_action": action,
+            "p_priority": priority
+        }))
+        task = response.data
         
-        response = admin_client.from_("tasks").insert(task_data).execute()
-        return response.data[0] if response.data else {"error": "Failed to create task"}
+        if not task:
+            return {"error": "Failed to create task"}
+        if "error" in task:
+            return task
+        
+        invalidate_cached_reads()
+        return task
         
     except Exception as e:
         logger.error(f"Error creating task: {str(e)}")
@@ -307,14 +502,9 @@ async def create_tasks_bulk(ticket_id: str, tasks: List[Dict]) -> Dict:
     """Create multiple tasks for a ticket (admin only). Also set ticket status to 'accepted'"""
     try:
         admin_client = get_supabase_admin_client()
-        # Verify ticket exists
-        ticket_check = admin_client.from_("tickets").select("id, client_id").eq("id", ticket_id).single().execute()
-        if not ticket_check.data:
-            return {"error": "Ticket not found"}
 
-        # Validate users and prepare insert payload
+        # Validate tasks and prepare insert payload
         insert_payload = []
-        valid_priorities = {"low", "medium", "high", "urgent"}
         for t in tasks:
             action = t.get("action")
             assigned_to = t.get("assigned_to")
@@ -322,39 +512,40 @@ async def create_tasks_bulk(ticket_id: str, tasks: List[Dict]) -> Dict:
 
             if not action or not assigned_to:
                 return {"error": "Each task must include 'action' and 'assigned_to'"}
-            if priority not in valid_priorities:
-                return {"error": f"Invalid priority '{priority}'. Allowed: {list(valid_priorities)}"}
-
-            # Validate assigned user exists
-            user_check = admin_client.from_("users").select("id").eq("id", assigned_to).single().execute()
-            if not user_check.data:
-                return {"error": f"Assigned user not found: {assigned_to}"}
+            if priority not in _VALID_PRIORITIES:
+                return {"error": f"Invalid priority '{priority}'. Allowed: {_VALID_PRIORITIES_LIST}"}
 
             insert_payload.append({
-                "ticket_id": ticket_id,
                 "assigned_to": assigned_to,
                 "action": action,
-                "priority": priority,
-                "status": "in_progress"
+                "priority": priority
             })
 
         if not insert_payload:
             return {"error": "No valid tasks to create"}
 
-        # Insert tasks in bulk
-        response = admin_client.from_("tasks").insert(insert_payload).execute()
-        created = response.data if response.data else []
+        # Ticket and assignee checks, bulk insert and the ticket status update
+        # run in one transaction server-side (see supabase/migrations)
+        response = await _execute(admin_client.rpc("create_tasks_bulk", {
+            "p_ticket_id": ticket_id,
+            "p_tasks": insert_payload
+        }))
+        result = response.data
 
-        # Update ticket status to accepted
-        admin_client.from_("tickets").update({"status": "accepted"}).eq("id", ticket_id).execute()
+        if not result:
+            return {"error": "Failed to create tasks"}
+        if "error" in result:
+            return result
 
-        return {"tasks": created, "ticket_id": ticket_id, "ticket_status": "accepted"}
+        invalidate_cached_reads()
+        return result
 
     except Exception as e:
         logger.error(f"Error creating tasks bulk for ticket {ticket_id}: {str(e)}")
         return {"error": str(e)}
 
-def create_project(name: str, client_id: str, website: str = None, socials: str = None):
+
+async def create_project(name: str, client_id: str, website: str = None, socials: str = None):
     """
     Create a new project in the database
     
@@ -370,154 +561,111 @@ def create_project(name: str, client_id: str, website: str = None, socials: str
     try:
         admin_client = get_supabase_admin_client()
         
-        # Verify client exists
-        client_check = admin_client.from_("users").select("id, role").eq("id", client_id).single().execute()
-        if not client_check.data:
-            return {"error": "Client not found"}
-        
-        # Verify the user is actually a client
-        if client_check.data.get("role") != "client":
-            return {"error": "Specified user is not a client"}
-        
-        # Prepare project data
-        project_data = {
-            "name": name,
-            "client_id": client_id,
-            "status": "in_development"
-        }
-        
-        # Add optional fields if provided
-        if website:
-            project_data["website_url"] = website
-        if socials:
-            project_data["social_links"] = socials
-            
-        # Insert the project
-        response = admin_client.from_("projects").insert(project_data).execute()
+        # Client validation and insert happen in one RPC (see supabase/migrations)
+        response = await _execute(admin_client.rpc("create_project_safe", {
+            "p_name": name,
+            "p_client_id": client_id,
+            "p_website": website or None,
+            "p_socials": socials or None
+        }))
+        project = response.data
         
-        if response.data:
-            logger.info(f"Project created successfully: {response.data[0].get('id')}")
-            return {"project": response.data[0]}
-        else:
+        if not project:
             return {"error": "Failed to create project"}
+        if "error" in project:
+            return project
+        
+        invalidate_cached_reads()
+        logger.info(f"Project created successfully: {project.get('id')}")
+        return {"project": project}
             
     except Exception as e:
         logger.error(f"Error creating project: {str(e)}")
         return {"error": str(e)}
 
-async def get_all_projects_with_relations() -> List[Dict]:
-    """Return all projects with related client, tickets and tasks (admin client)."""
+# Fallback used when a project has no (or a deleted) client
+_UNKNOWN_CLIENT = {
+    "id": None,
+    "email": "Unknown Client",
+    "username": "unknown",
+    "full_name": "Unknown Client"
+}
+
+# Project with its client, tickets and the tickets' tasks in one request
+_PROJECT_WITH_RELATIONS_SELECT = f"{PROJECT_COLUMNS}, client:client_id(id, email, username, full_name), tickets({TICKET_COLUMNS}, tasks({TASK_COLUMNS}))"
+
+async def get_projects_page(limit: Optional[int] = None, cursor: Optional[str] = None) -> List[Dict]:
+    """
+    Projects (or one page of them) with related client, tickets and tasks (admin client)
+    Not cached, so the NDJSON stream does not keep one entry per cursor in
+    memory. Errors are raised, so a failed page is not mistaken for the end.
+    """
+    admin_client = get_supabase_admin_client()
+    
+    # Single nested select instead of one query per project/ticket
+    projects_response = await _execute(_page(admin_client.from_("projects").select(_PROJECT_WITH_RELATIONS_SELECT), limit, cursor))
+    projects = projects_response.data if projects_response.data else []
+    
+    for project in projects:
+        project["client"] = project.get("client") or dict(_UNKNOWN_CLIENT)
+        project["tickets"] = project.get("tickets") or []
+    
+    return projects
+
+@async_ttl_cache(ttl=30)
+async def get_all_projects_with_relations(limit: Optional[int] = None, cursor: Optional[str] = None) -> List[Dict]:
+    """Return all projects (or one page of them) with related client, tickets and tasks (admin client)."""
     try:
-        admin_client = get_supabase_admin_client()
-        
-        # Get projects
-        projects_response = admin_client.from_("projects").select("*").order("created_at", desc=True).execute()
-        projects = projects_response.data if projects_response.data else []
-        
-        # For each project, get client and tickets separately
-        for project in projects:
-            # Get client info
-            if project.get("client_id"):
-                client_response = admin_client.from_("users").select("id, email, username, full_name").eq("id", project["client_id"]).single().execute()
-                project["client"] = client_response.data if client_response.data else {
-                    "id": None,
-                    "email": "Unknown Client",
-                    "username": "unknown", 
-                    "full_name": "Unknown Client"
-                }
-            else:
-                project["client"] = {
-                    "id": None,
-                    "email": "Unknown Client",
-                    "username": "unknown",
-                    "full_name": "Unknown Client"
-                }
-            
-            # Get tickets for this project
-            tickets_response = admin_client.from_("tickets").select("*").eq("project_id", project["id"]).execute()
-            tickets = tickets_response.data if tickets_response.data else []
-            
-            # For each ticket, get tasks
-            for ticket in tickets:
-                tasks_response = admin_client.from_("tasks").select("*").eq("ticket_id", ticket["id"]).execute()
-                ticket["tasks"] = tasks_response.data if tasks_response.data else []
-            
-            project["tickets"] = tickets
-        
-        return projects
+        return await get_projects_page(limit, cursor)
     except Exception as e:
         logger.error(f"Error fetching projects with relations: {str(e)}")
-        return []
+        return Uncached([])
 
 async def get_project_with_relations(project_id: str) -> Optional[Dict]:
     """Return single project with related client, tickets and tasks (admin client)."""
     try:
         admin_client = get_supabase_admin_client()
         
-        # Get project
-        project_response = admin_client.from_("projects").select("*").eq("id", project_id).single().execute()
-        if not project_response.data:
+        # Get project with client, tickets and tasks embedded
+        project_response = await _execute(admin_client.from_("projects").select(_PROJECT_WITH_RELATIONS_SELECT).eq("id", project_id).maybe_single())
+        if not project_response:
             return None
         
         project = project_response.data
-        
-        # Get client info
-        if project.get("client_id"):
-            client_response = admin_client.from_("users").select("id, email, username, full_name").eq("id", project["client_id"]).single().execute()
-            project["client"] = client_response.data if client_response.data else {
-                "id": None,
-                "email": "Unknown Client", 
-                "username": "unknown",
-                "full_name": "Unknown Client"
-            }
-        else:
-            project["client"] = {
-                "id": None,
-                "email": "Unknown Client",
-                "username": "unknown",
-                "full_name": "Unknown Client"
-            }
-        
-        # Get tickets for this project
-        tickets_response = admin_client.from_("tickets").select("*").eq("project_id", project["id"]).execute()
-        tickets = tickets_response.data if tickets_response.data else []
-        
-        # For each ticket, get tasks
-        for ticket in tickets:
-            tasks_response = admin_client.from_("tasks").select("*").eq("ticket_id", ticket["id"]).execute()
-            ticket["tasks"] = tasks_response.data if tasks_response.data else []
-        
-        project["tickets"] = tickets
+        project["client"] = project.get("client") or dict(_UNKNOWN_CLIENT)
+        project["tickets"] = project.get("tickets") or []
         
         return project
     except Exception as e:
         logger.error(f"Error fetching project {project_id}: {str(e)}")
         return None
 
+@async_ttl_cache(ttl=10)
 async def get_users_by_role_with_projects(role: str) -> List[Dict]:
     """Get users by role with project counts (for clients)"""
     try:
         admin_client = get_supabase_admin_client()
         
-        # Get users by role
-        response = admin_client.from_("users").select("*").eq("role", role).order("created_at").execute()
-        users = response.data if response.data else []
+        # Users from the grouped snapshot; copies, since the snapshot is shared
+        grouped = await get_users_grouped_by_role()
+        users = [dict(user) for user in grouped.get(role, [])]
+        
+        # Add project counts for each user (only for clients): one IN query
+        # for all clients, grouped by client_id in memory
+        projects_count = defaultdict(int)
+        if role == "client" and users:
+            projects_response = await _execute(admin_client.from_("projects").select("client_id").in_("client_id", [user["id"] for user in users]))
+            for project in projects_response.data or []:
+                projects_count[project["client_id"]] += 1
         
-        # Add project counts for each user (only for clients)
         for user in users:
-            if role == "client":
-                # Count projects for this client
-                projects_response = admin_client.from_("projects").select("id", count="exact").eq("client_id", user["id"]).execute()
-                user["projects_count"] = projects_response.count if projects_response.count else 0
-                
-            else:
-                user["projects_count"] = 0
-                       
+            user["projects_count"] = projects_count[user["id"]]
+        
         return users
         
     except Exception as e:
         logger.error(f"Error fetching users with role {role}: {str(e)}")
-        return []
+        return Uncached([])
 
 
 async def get_client_projects(client_id: str) -> List[Dict]:
@@ -526,18 +674,24 @@ async def get_client_projects(client_id: str) -> List[Dict]:
         admin_client = get_supabase_admin_client()
         
         # Get projects for this client
-        projects_response = admin_client.from_("projects").select("*").eq("client_id", client_id).order("created_at", desc=True).execute()
+        projects_response = await _execute(admin_client.from_("projects").select(PROJECT_COLUMNS).eq("client_id", client_id).order("created_at", desc=True))
         projects = projects_response.data if projects_response.data else []
         
-        # For each project, get basic ticket counts
+        if not projects:
+            return []
+        
+        # Ticket counts for all projects from one query, aggregated in memory
+        tickets_response = await _execute(admin_client.from_("tickets").select("project_id, status").in_("project_id", [project["id"] for project in projects]))
+        tickets_count = defaultdict(int)
+        open_tickets_count = defaultdict(int)
+        for ticket in tickets_response.data or []:
+            tickets_count[ticket["project_id"]] += 1
+            if ticket.get("status") in _OPEN_TICKET_STATUSES:
+                open_tickets_count[ticket["project_id"]] += 1
+        
         for project in projects:
-            # Count total tickets for this project
-            tickets_response = admin_client.from_("tickets").select("id", count="exact").eq("project_id", project["id"]).execute()
-            project["tickets_count"] = tickets_response.count if tickets_response.count else 0
-            
-            # Count open tickets for this project
-            open_tickets_response = admin_client.from_("tickets").select("id", count="exact").eq("project_id", project["id"]).in_("status", ["to_read", "processing"]).execute()
-            project["open_tickets_count"] = open_tickets_response.count if open_tickets_response.count else 0
+            project["tickets_count"] = tickets_count[project["id"]]
+            project["open_tickets_count"] = open_tickets_count[project["id"]]
         
         return projects
         
@@ -550,105 +704,107 @@ async def create_ticket(project_id: str, client_id: str, message: str) -> Dict:
     try:
         admin_client = get_supabase_admin_client()
         
-        # Verify project exists and belongs to the client
-        project_check = admin_client.from_("projects").select("id, client_id, name").eq("id", project_id).single().execute()
-        if not project_check.data:
-            return {"error": "Project not found"}
+        # Ownership check and insert happen in one RPC (see supabase/migrations)
+        response = await _execute(admin_client.rpc("create_ticket_safe", {
+            "p_project_id": project_id,
+            "p_client_id": client_id,
+            "p_message": message
+        }))
+        ticket = response.data
         
-        if project_check.data.get("client_id") != client_id:
-            return {"error": "You can only create tickets for your own projects"}
-        
-        # Create ticket data
-        ticket_data = {
-            "project_id": project_id,
-            "client_id": client_id,
-            "message": message,
-            "status": "to_read"  # Default status for new tickets
-        }
-        
-        # Insert the ticket
-        response = admin_client.from_("tickets").insert(ticket_data).execute()
-        
-        if response.data:
-            logger.info(f"Ticket created successfully: {response.data[0].get('id')}")
-            return {"ticket": response.data[0]}
-        else:
+        if not ticket:
             return {"error": "Failed to create ticket"}
+        if "error" in ticket:
+            return ticket
+        
+        invalidate_cached_reads()
+        logger.info(f"Ticket created successfully: {ticket.get('id')}")
+        return {"ticket": ticket}
             
     except Exception as e:
         logger.error(f"Error creating ticket: {str(e)}")
         return {"error": str(e)}
 
+# Ticket with its project and tasks (plus assignee) for client views
+_CLIENT_TICKET_SELECT = """
+    id,
+    project_id,
+    message,
+    status,
+    created_at,
+    updated_at,
+    projects:project_id (
+        id,
+        name,
+        status
+    ),
+    tasks (
+        id,
+        action,
+        priority,
+        status,
+        created_at,
+        updated_at,
+        users:assigned_to (
+            full_name,
+            username
+        )
+    )
+"""
+
+def _attach_client_tasks(ticket: Dict) -> Dict:
+    """Format embedded tasks for client view and add task statistics in one pass"""
+    tasks = ticket.get("tasks") or []
+    # Newest tasks first
+    tasks.sort(key=lambda task: task.get("created_at") or "", reverse=True)
+    
+    formatted_tasks = []
+    completed_tasks = 0
+    active_tasks = 0
+    for task in tasks:
+        assigned_user = task.get("users") or {}
+        task_status = task.get("status")
+        if task_status == "completed":
+            completed_tasks += 1
+        elif task_status == "in_progress":
+            active_tasks += 1
+        
+        formatted_tasks.append({
+            "id": task.get("id"),
+            "action": task.get("action"),
+            "priority": task.get("priority"),
+            "status": task_status,
+            "assigned_to": {
+                # Only name and username, staff emails stay private
+                "name": assigned_user.get("full_name") or "Staff Member",
+                "username": assigned_user.get("username") or "staff"
+            },
+            "created_at": task.get("created_at"),
+            "updated_at": task.get("updated_at")
+        })
+    
+    ticket["tasks"] = formatted_tasks
+    ticket["tasks_count"] = len(formatted_tasks)
+    ticket["completed_tasks"] = completed_tasks
+    ticket["active_tasks"] = active_tasks
+    return ticket
+
 async def get_client_tickets(client_id: str, project_id: str = None) -> List[Dict]:
     """Get tickets for a client, optionally filtered by project, with task details"""
     try:
         admin_client = get_supabase_admin_client()
         
-        # Build query
-        query = admin_client.from_("tickets").select("""
-            id,
-            project_id,
-            message,
-            status,
-            created_at,
-            updated_at,
-            projects:project_id (
-                id,
-                name,
-                status
-            )
-        """).eq("client_id", client_id)
+        # Build query, tasks are embedded instead of fetched per ticket
+        query = admin_client.from_("tickets").select(_CLIENT_TICKET_SELECT).eq("client_id", client_id)
         
         # Filter by project if specified
         if project_id:
             query = query.eq("project_id", project_id)
         
-        response = query.order("created_at", desc=True).execute()
+        response = await _execute(query.order("created_at", desc=True))
         tickets = response.data if response.data else []
         
-        # For each ticket, get task details
-        for ticket in tickets:
-            # Get tasks with assigned user info
-            tasks_response = admin_client.from_("tasks").select("""
-                id,
-                action,
-                priority,
-                status,
-                created_at,
-                updated_at,
-                users:assigned_to (
-                    full_name,
-                    username
-                )
-            """).eq("ticket_id", ticket["id"]).order("created_at", desc=True).execute()
-            
-            tasks = tasks_response.data if tasks_response.data else []
-            
-            # Format tasks for client view
-            formatted_tasks = []
-            for task in tasks:
-                assigned_user = task.get("users") or {}
-                formatted_task = {
-                    "id": task.get("id"),
-                    "action": task.get("action"),
-                    "priority": task.get("priority"),
-                    "status": task.get("status"),
-                    "assigned_to": {
-                        "name": assigned_user.get("full_name") or "Staff Member",
-                        "username": assigned_user.get("username") or "staff"
-                    },
-                    "created_at": task.get("created_at"),
-                    "updated_at": task.get("updated_at")
-                }
-                formatted_tasks.append(formatted_task)
-            
-            # Add task statistics
-            ticket["tasks"] = formatted_tasks
-            ticket["tasks_count"] = len(formatted_tasks)
-            ticket["completed_tasks"] = len([t for t in formatted_tasks if t["status"] == "completed"])
-            ticket["active_tasks"] = len([t for t in formatted_tasks if t["status"] == "in_progress"])
-        
-        return tickets
+        return [_attach_client_tasks(ticket) for ticket in tickets]
         
     except Exception as e:
         logger.error(f"Error fetching tickets for client {client_id}: {str(e)}")
@@ -660,69 +816,13 @@ async def get_client_ticket_with_tasks(client_id: str, ticket_id: str) -> Option
     try:
         admin_client = get_supabase_admin_client()
         
-        # Get ticket and verify ownership
-        ticket_response = admin_client.from_("tickets").select("""
-            id,
-            project_id,
-            message,
-            status,
-            created_at,
-            updated_at,
-            projects:project_id (
-                id,
-                name,
-                status
-            )
-        """).eq("id", ticket_id).eq("client_id", client_id).single().execute()
-        
-        if not ticket_response.data:
-            return None
-        
-        ticket = ticket_response.data
-        
-        # Get tasks for this ticket with assigned user details
-        tasks_response = admin_client.from_("tasks").select("""
-            id,
-            action,
-            priority,
-            status,
-            created_at,
-            updated_at,
-            users:assigned_to (
-                id,
-                full_name,
-                username,
-                email
-            )
-        """).eq("ticket_id", ticket_id).order("created_at", desc=True).execute()
-        
-        tasks = tasks_response.data if tasks_response.data else []
-        
-        # Format tasks for client view (hide sensitive info)
-        formatted_tasks = []
-        for task in tasks:
-            assigned_user = task.get("users") or {}
-            formatted_task = {
-                "id": task.get("id"),
-                "action": task.get("action"),
-                "priority": task.get("priority"),
-                "status": task.get("status"),
-                "assigned_to": {
-                    "name": assigned_user.get("full_name") or "Staff Member",
-                    "username": assigned_user.get("username") or "staff"
-                    # Hide email for privacy
-                },
-                "created_at": task.get("created_at"),
-                "updated_at": task.get("updated_at")
-            }
-            formatted_tasks.append(formatted_task)
+        # Get ticket with tasks and verify ownership
+        ticket_response = await _execute(admin_client.from_("tickets").select(_CLIENT_TICKET_SELECT).eq("id", ticket_id).eq("client_id", client_id).maybe_single())
         
-        ticket["tasks"] = formatted_tasks
-        ticket["tasks_count"] = len(formatted_tasks)
-        ticket["completed_tasks"] = len([t for t in formatted_tasks if t["status"] == "completed"])
-        ticket["active_tasks"] = len([t for t in formatted_tasks if t["status"] == "in_progress"])
+        if not ticket_response:
+            return None
         
-        return ticket
+        return _attach_client_tasks(ticket_response.data)
         
     except Exception as e:
         logger.error(f"Error fetching ticket {ticket_id} for client {client_id}: {str(e)}")
@@ -735,48 +835,22 @@ async def start_task_timer(task_id: str, user_id: str) -> Dict:
     try:
         admin_client = get_supabase_admin_client()
         
-        # Verify task exists and user has permission
-        task_check = admin_client.from_("tasks").select("assigned_to, time_logs").eq("id", task_id).single().execute()
-        
-        if not task_check.data:
-            return {"error": "Task not found"}
-        
-        # Check if user is assigned to this task or is admin
-        user_role_check = admin_client.from_("users").select("role").eq("id", user_id).single().execute()
-        user_role = user_role_check.data.get("role") if user_role_check.data else None
-        
-        if task_check.data["assigned_to"] != user_id and user_role != "admin":
-            return {"error": "Permission denied"}
-        
-        # Check if there's already an active session (no end_time)
-        time_logs = task_check.data.get("time_logs") or []
-        active_session = next((log for log in time_logs if not log.get("end_time")), None)
-        
-        if active_session:
-            return {"error": "Task timer is already running"}
+        # Permission check, running-session check and the time_logs append
+        # happen atomically in one RPC (see supabase/migrations)
+        response = await _execute(admin_client.rpc("start_task_timer", {
+            "p_task_id": task_id,
+            "p_user_id": user_id
+        }))
+        result = response.data
         
-        # Add new session start
-        from datetime import datetime
-        start_time = datetime.utcnow().isoformat()
-        
-        new_session = {
-            "start_time": start_time,
-            "started_by": user_id
-        }
-        
-        time_logs.append(new_session)
-        
-        # Update task
-        response = admin_client.from_("tasks").update({
-            "time_logs": time_logs,
-            "status": "in_progress"  # Auto-start task when timer starts
-        }).eq("id", task_id).execute()
-        
-        if response.data:
-            logger.info(f"Timer started for task {task_id} by user {user_id}")
-            return {"session": new_session, "task_id": task_id}
-        else:
+        if not result:
             return {"error": "Failed to start timer"}
+        if "error" in result:
+            return result
+        
+        invalidate_cached_reads()
+        logger.info(f"Timer started for task {task_id} by user {user_id}")
+        return result
             
     except Exception as e:
         logger.error(f"Error starting task timer: {str(e)}")
@@ -788,118 +862,48 @@ async def stop_task_timer(task_id: str, user_id: str) -> Dict:
     try:
         admin_client = get_supabase_admin_client()
         
-        # Verify task exists and user has permission
-        task_check = admin_client.from_("tasks").select("assigned_to, time_logs").eq("id", task_id).single().execute()
-        
-        if not task_check.data:
-            return {"error": "Task not found"}
-        
-        # Check permission
-        user_role_check = admin_client.from_("users").select("role").eq("id", user_id).single().execute()
-        user_role = user_role_check.data.get("role") if user_role_check.data else None
-        
-        if task_check.data["assigned_to"] != user_id and user_role != "admin":
-            return {"error": "Permission denied"}
-        
-        # Find active or paused session
-        time_logs = task_check.data.get("time_logs") or []
-        active_session_index = next(
-            (i for i, log in enumerate(time_logs) if not log.get("end_time")), 
-            None
-        )
+        # Permission check, session lookup, duration and totals are computed
+        # atomically in one RPC (see supabase/migrations)
+        response = await _execute(admin_client.rpc("stop_task_timer", {
+            "p_task_id": task_id,
+            "p_user_id": user_id
+        }))
+        result = response.data
         
-        if active_session_index is None:
-            return {"error": "No active or paused timer found"}
-        
-        # Complete the session
-        from datetime import datetime
-        end_time = datetime.utcnow().isoformat()
-        session = time_logs[active_session_index]
-        
-        # Calculate total duration (including pause time if any)
-        start_time = session["start_time"]
-        start_dt = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
-        end_dt = datetime.fromisoformat(end_time.replace('Z', '+00:00'))
-        
-        # If session was paused, calculate duration excluding pause time
-        if session.get("paused_at") and session.get("resumed_at"):
-            # Session was paused and resumed
-            pause_dt = datetime.fromisoformat(session["paused_at"].replace('Z', '+00:00'))
-            resume_dt = datetime.fromisoformat(session["resumed_at"].replace('Z', '+00:00'))
-            pause_duration = (resume_dt - pause_dt).total_seconds() / 60
-            total_duration = int((end_dt - start_dt).total_seconds() / 60 - pause_duration)
-        elif session.get("paused_at"):
-            # Currently paused, calculate duration up to pause
-            pause_dt = datetime.fromisoformat(session["paused_at"].replace('Z', '+00:00'))
-            total_duration = int((pause_dt - start_dt).total_seconds() / 60)
-        else:
-            # No pause, normal calculation
-            total_duration = int((end_dt - start_dt).total_seconds() / 60)
-        
-        # Update session
-        time_logs[active_session_index].update({
-            "end_time": end_time,
-            "duration_minutes": total_duration,
-            "completion_note": note or "",
-            "completed_by": user_id
-        })
-        
-        # Calculate totals
-        total_minutes = sum(log.get("duration_minutes", 0) for log in time_logs if log.get("duration_minutes"))
-        sessions_count = len([log for log in time_logs if log.get("end_time")])
-        
-        # Update task
-        response = admin_client.from_("tasks").update({
-            "time_logs": time_logs,
-            "total_time_minutes": total_minutes,
-            "time_sessions_count": sessions_count
-        }).eq("id", task_id).execute()
-        
-        if response.data:
-            logger.info(f"Timer stopped for task {task_id} by user {user_id}. Duration: {duration_minutes} minutes")
-            return {
-                "session": time_logs[active_session_index],
-                "task_id": task_id,
-                "total_time_minutes": total_minutes,
-                "sessions_count": sessions_count
-            }
-        else:
+        if not result:
             return {"error": "Failed to stop timer"}
+        if "error" in result:
+            return result
+        
+        invalidate_cached_reads()
+        logger.info(f"Timer stopped for task {task_id} by user {user_id}. Duration: {result['session'].get('duration_minutes')} minutes")
+        return result
             
     except Exception as e:
         logger.error(f"Error stopping task timer: {str(e)}")
         return {"error": str(e)}
 
+# Task time tracking data with the assignee's name
+_TASK_TIME_LOGS_SELECT = "id, action, assigned_to, status, time_logs, total_time_minutes, time_sessions_count, users:assigned_to(full_name, username)"
+
 async def get_task_time_logs(task_id: str, user_id: str) -> Dict:
     """Get time logs for a task (staff/admin only)"""
     try:
         admin_client = get_supabase_admin_client()
         
-        # Get task with time logs
-        task_response = admin_client.from_("tasks").select("""
-            id,
-            action,
-            assigned_to,
-            status,
-            time_logs,
-            total_time_minutes,
-            time_sessions_count,
-            users:assigned_to (
-                full_name,
-                username
-            )
-        """).eq("id", task_id).single().execute()
-        
-        if not task_response.data:
+        # Fetch the task with time logs and the user's role concurrently
+        task_response, user_role = await asyncio.gather(
+            _execute(admin_client.from_("tasks").select(_TASK_TIME_LOGS_SELECT).eq("id", task_id).maybe_single()),
+            _get_user_role(user_id)
+        )
+        
+        if not task_response:
             return {"error": "Task not found"}
         
         task = task_response.data
         
         # Check permission
-        user_role_check = admin_client.from_("users").select("role").eq("id", user_id).single().execute()
-        user_role = user_role_check.data.get("role") if user_role_check.data else None
-        
-        if task["assigned_to"] != user_id and user_role not in ["admin", "internal_staff"]:
+        if task["assigned_to"] != user_id and user_role not in _TIME_LOG_VIEWER_ROLES:
             return {"error": "Permission denied"}
         
         time_logs = task.get("time_logs") or []
@@ -931,62 +935,21 @@ async def pause_task_timer(task_id: str, user_id: str, note: str = None) -> Dict
     try:
         admin_client = get_supabase_admin_client()
         
-        # Verify task exists and user has permission
-        task_check = admin_client.from_("tasks").select("assigned_to, time_logs").eq("id", task_id).single().execute()
+        # Only the running session is rewritten, atomically, in one RPC
+        response = await _execute(admin_client.rpc("pause_task_timer", {
+            "p_task_id": task_id,
+            "p_user_id": user_id,
+            "p_note": note
+        }))
+        result = response.data
         
-        if not task_check.data:
-            return {"error": "Task not found"}
-        
-        # Check permission
-        user_role_check = admin_client.from_("users").select("role").eq("id", user_id).single().execute()
-        user_role = user_role_check.data.get("role") if user_role_check.data else None
-        
-        if task_check.data["assigned_to"] != user_id and user_role != "admin":
-            return {"error": "Permission denied"}
-        
-        # Find active session
-        time_logs = task_check.data.get("time_logs") or []
-        active_session_index = next(
-            (i for i, log in enumerate(time_logs) if not log.get("end_time") and not log.get("paused_at")), 
-            None
-        )
-        
-        if active_session_index is None:
-            return {"error": "No active timer found"}
-        
-        # Pause the session
-        from datetime import datetime
-        pause_time = datetime.utcnow().isoformat()
-        
-        # Calculate duration up to pause
-        start_time = time_logs[active_session_index]["start_time"]
-        start_dt = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
-        pause_dt = datetime.fromisoformat(pause_time.replace('Z', '+00:00'))
-        duration_minutes = int((pause_dt - start_dt).total_seconds() / 60)
-        
-        # Update session with pause info
-        time_logs[active_session_index].update({
-            "paused_at": pause_time,
-            "duration_before_pause": duration_minutes,
-            "pause_note": note or "",
-            "paused_by": user_id
-        })
-        
-        # Update task
-        response = admin_client.from_("tasks").update({
-            "time_logs": time_logs
-        }).eq("id", task_id).execute()
-        
-        if response.data:
-            logger.info(f"Timer paused for task {task_id} by user {user_id}. Duration before pause: {duration_minutes} minutes")
-            return {
-                "session": time_logs[active_session_index],
-                "task_id": task_id,
-                "duration_before_pause": duration_minutes,
-                "status": "paused"
-            }
-        else:
+        if not result:
             return {"error": "Failed to pause timer"}
+        if "error" in result:
+            return result
+        
+        logger.info(f"Timer paused for task {task_id} by user {user_id}. Duration before pause: {result.get('duration_before_pause')} minutes")
+        return result
             
     except Exception as e:
         logger.error(f"Error pausing task timer: {str(e)}")
@@ -998,58 +961,21 @@ async def resume_task_timer(task_id: str, user_id: str, note: str = None) -> Dic
     try:
         admin_client = get_supabase_admin_client()
         
-        # Verify task exists and user has permission
-        task_check = admin_client.from_("tasks").select("assigned_to, time_logs").eq("id", task_id).single().execute()
+        # Only the paused session is rewritten, atomically, in one RPC
+        response = await _execute(admin_client.rpc("resume_task_timer", {
+            "p_task_id": task_id,
+            "p_user_id": user_id,
+            "p_note": note
+        }))
+        result = response.data
         
-        if not task_check.data:
-            return {"error": "Task not found"}
-        
-        # Check permission
-        user_role_check = admin_client.from_("users").select("role").eq("id", user_id).single().execute()
-        user_role = user_role_check.data.get("role") if user_role_check.data else None
-        
-        if task_check.data["assigned_to"] != user_id and user_role != "admin":
-            return {"error": "Permission denied"}
-        
-        # Find paused session
-        time_logs = task_check.data.get("time_logs") or []
-        paused_session_index = next(
-            (i for i, log in enumerate(time_logs) if log.get("paused_at") and not log.get("end_time")), 
-            None
-        )
-        
-        if paused_session_index is None:
-            return {"error": "No paused timer found"}
-        
-        # Resume the session
-        from datetime import datetime
-        resume_time = datetime.utcnow().isoformat()
-        
-        # Update session with resume info
-        time_logs[paused_session_index].update({
-            "resumed_at": resume_time,
-            "resume_note": note or "",
-            "resumed_by": user_id
-        })
-        
-        # Remove paused_at to make it active again
-        if "paused_at" in time_logs[paused_session_index]:
-            del time_logs[paused_session_index]["paused_at"]
-        
-        # Update task
-        response = admin_client.from_("tasks").update({
-            "time_logs": time_logs
-        }).eq("id", task_id).execute()
-        
-        if response.data:
-            logger.info(f"Timer resumed for task {task_id} by user {user_id}")
-            return {
-                "session": time_logs[paused_session_index],
-                "task_id": task_id,
-                "status": "active"
-            }
-        else:
+        if not result:
             return {"error": "Failed to resume timer"}
+        if "error" in result:
+            return result
+        
+        logger.info(f"Timer resumed for task {task_id} by user {user_id}")
+        return result
             
     except Exception as e:
         logger.error(f"Error resuming task timer: {str(e)}")
@@ -1061,96 +987,17 @@ async def get_client_active_timers(client_id: str) -> Dict:
     try:
         admin_client = get_supabase_admin_client()
         
-        # Get all projects for this client
-        projects_response = admin_client.from_("projects").select("id").eq("client_id", client_id).execute()
-        
-        if not projects_response.data:
-            return {
-                "client_id": client_id,
-                "active_timers": [],
-                "total_active_timers": 0
-            }
-        
-        project_ids = [project["id"] for project in projects_response.data]
-        
-        # Get all tickets for client's projects
-        tickets_response = admin_client.from_("tickets").select("id").in_("project_id", project_ids).execute()
-        
-        if not tickets_response.data:
-            return {
-                "client_id": client_id,
-                "active_timers": [],
-                "total_active_timers": 0
-            }
-        
-        ticket_ids = [ticket["id"] for ticket in tickets_response.data]
-        
-        # Get all tasks for these tickets with time logs
-        tasks_response = admin_client.from_("tasks").select("""
-            id,
-            action,
-            time_logs,
-            assigned_to,
-            users:assigned_to (
-                full_name,
-                username
-            ),
-            tickets!inner (
-                id,
-                message,
-                projects!inner (
-                    id,
-                    name
-                )
-            )
-        """).in_("ticket_id", ticket_ids).execute()
-        
-        if not tasks_response.data:
-            return {
-                "client_id": client_id,
-                "active_timers": [],
-                "total_active_timers": 0
-            }
-        
-        active_timers = []
-        
-        # Check each task for active timers
-        for task in tasks_response.data:
-            time_logs = task.get("time_logs", [])
-            if not time_logs:
-                continue
-            
-            # Find active session (end_time is null)
-            for session in time_logs:
-                if session.get("end_time") is None and session.get("start_time"):
-                    user_info = task.get("users") or {}
-                    ticket_info = task.get("tickets") or {}
-                    project_info = ticket_info.get("projects") or {}
-                    
-                    active_timers.append({
-                        "task_id": task.get("id"),
-                        "task_action": task.get("action"),
-                        "start_time": session.get("start_time"),
-                        "session_id": session.get("session_id"),
-                        "user_id": session.get("user_id"),
-                        "user_name": user_info.get("full_name") or user_info.get("username") or "Staff Member",
-                        "user_username": user_info.get("username"),
-                        "project": {
-                            "id": project_info.get("id"),
-                            "name": project_info.get("name")
-                        },
-                        "ticket": {
-                            "id": ticket_info.get("id"),
-                            "message": ticket_info.get("message")
-                        }
-                    })
-                    break  # Only one active session per task
+        # Projects, tickets, tasks and the open sessions in their time_logs
+        # are joined server-side in one RPC (see supabase/migrations)
+        response = await _execute(admin_client.rpc("client_active_timers", {"p_client_id": client_id}))
+        result = response.data or {}
+        active_timers = result.get("active_timers") or []
         
         return {
             "client_id": client_id,
             "active_timers": active_timers,
             "total_active_timers": len(active_timers),
-            "projects_checked": len(project_ids),
+            "projects_checked": result.get("projects_checked", 0),
             "timestamp": datetime.now().isoformat()
         }
         
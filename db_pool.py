@@ -0,0 +1,88 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Optional
+
+import asyncpg
+
+from config import settings
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Created on first use, closed by the FastAPI lifespan hook
+_pool: Optional[asyncpg.Pool] = None
+_pool_lock = asyncio.Lock()
+
+# After a failed connect, PostgREST is used for this many seconds before
+# the pool is tried again
+POOL_RETRY_DELAY = 30
+_retry_at = 0.0
+
+# Failures of a pooled read that PostgREST can serve instead
+_POOL_ERRORS = (asyncpg.PostgresError, asyncpg.InterfaceError, OSError, asyncio.TimeoutError)
+
+async def get_pool() -> Optional[asyncpg.Pool]:
+    """
+    Get the shared asyncpg pool for direct Postgres reads
+    Returns None when SUPABASE_DB_URL is not set or the pool cannot connect;
+    callers then keep using PostgREST through the Supabase client.
+    """
+    global _pool, _retry_at
+    if _pool is not None or not settings.supabase_db_url or time.monotonic() < _retry_at:
+        return _pool
+    
+    async with _pool_lock:
+        if _pool is None and time.monotonic() >= _retry_at:
+            try:
+                _pool = await asyncpg.create_pool(
+                    dsn=settings.supabase_db_url,
+                    min_size=settings.db_pool_min_size,
+                    max_size=settings.db_pool_max_size,
+                    # Drop connections idle for 5 minutes; bound each statement
+                    max_inactive_connection_lifetime=300,
+                    command_timeout=30,
+                    # Supavisor/pgbouncer transaction mode cannot keep prepared statements
+                    statement_cache_size=0
+                )
+                logger.info("Postgres connection pool initialized")
+            except Exception as e:
+                _retry_at = time.monotonic() + POOL_RETRY_DELAY
+                logger.warning(f"Could not initialize Postgres pool, using PostgREST: {str(e)}")
+    return _pool
+
+async def warm_up_pool() -> None:
+    """
+    Open the pool ahead of the first request
+    get_pool logs a failed connect rather than raising, so the app still
+    starts and serves reads through PostgREST.
+    """
+    await get_pool()
+
+async def close_pool() -> None:
+    """Close the pool on shutdown"""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+async def fetch_json(query: str, *args) -> Any:
+    """
+    Run a query that returns a single json value and decode it
+    Building the JSON in Postgres (json_agg / row_to_json) keeps the result
+    types identical to what PostgREST returns.
+    Returns None when the pool is unavailable or the read fails, so callers
+    fall back to PostgREST instead of returning (and caching) empty data;
+    queries must therefore never yield SQL null themselves.
+    """
+    pool = await get_pool()
+    if pool is None:
+        return None
+    try:
+        async with pool.acquire() as conn:
+            value = await conn.fetchval(query, *args)
+    except _POOL_ERRORS as e:
+        logger.warning(f"Postgres read failed, falling back to PostgREST: {str(e)}")
+        return None
+    return json.loads(value) if value is not None else None
@@ -1,26 +1,46 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials
 from config import settings, get_app_config, get_cors_config, get_server_config
-from supabase import create_client
-from utils.auth import get_current_user, require_admin, require_admin_or_staff
-from typing import Dict
+from supabase import AuthApiError, create_client
+from utils.auth import get_current_user, require_admin, require_admin_or_staff, security, forget_token
+from utils.http_cache import cached_json_response
+from typing import Dict, Optional
 from datetime import datetime
+import orjson
+import re
+from contextlib import asynccontextmanager
+from db_pool import get_pool, warm_up_pool, close_pool
+from rest_client import rest_select
 
 from database import (
-    test_connection, get_db, get_all_users, 
-    get_users_by_role, get_users_by_role_with_tasks,  
+    test_connection, get_db, get_all_users, get_users_page,
+    get_users_grouped_by_role, get_users_by_role_with_tasks,  
     get_user_task_counts, get_tasks_by_user, update_task_status,
-    Client, get_supabase_client, create_task,
-    get_supabase_admin_client, get_user_by_id,
-    get_all_projects_with_relations, get_project_with_relations,
+    get_supabase_client, create_task,
+    get_supabase_admin_client,
+    get_all_projects_with_relations, get_projects_page, get_project_with_relations,
     create_tasks_bulk, create_project, get_users_by_role_with_projects,
     get_dashboard_stats, get_client_projects, create_ticket, get_client_tickets,
     get_client_ticket_with_tasks, start_task_timer, stop_task_timer, get_task_time_logs,
-    get_client_active_timers, pause_task_timer, resume_task_timer
+    get_client_active_timers, pause_task_timer, resume_task_timer,
+    invalidate_cached_reads, warm_up_clients, close_clients, next_page_cursor, PROJECT_COLUMNS
 )
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the pooled Supabase clients and Postgres pool at startup, close every pool on shutdown"""
+    warm_up_clients()
+    await warm_up_pool()
+    yield
+    await close_clients()
+    await close_pool()
+
 # Initialize FastAPI app with centralized configuration
-app = FastAPI(**get_app_config())
+app = FastAPI(**get_app_config(), default_response_class=ORJSONResponse, lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(CORSMiddleware, **get_cors_config())
@@ -30,20 +50,39 @@ app.add_middleware(CORSMiddleware, **get_cors_config())
 
 OPEN_TICKET_STATUSES = {"to_read", "accepted"}
 ACTIVE_TASK_STATUS = "in_progress"
+USER_ROLES = ("admin", "internal_staff", "client")
+TASK_PRIORITIES = ("low", "medium", "high", "urgent")
+
+# Browser cache lifetime (seconds) for polled admin views
+DASHBOARD_MAX_AGE = 30
+USER_LIST_MAX_AGE = 60
+
+# Upper bound for the optional ?limit= page size on admin listings
+MAX_PAGE_SIZE = 500
+# Rows fetched per database query by the NDJSON streams
+STREAM_PAGE_SIZE = 100
+
+# Static bodies of the public status endpoints, serialized once; settings
+# are fixed for the life of the process
+ROOT_BODY = orjson.dumps({
+    "message": "Auravisual Collab Manager API",
+    "version": settings.project_version,
+    "status": "running",
+    "environment": settings.environment
+})
+HEALTH_BODY = orjson.dumps({"status": "healthy", "service": "auravisual-backend"})
+
+# local@domain.tld; the local part becomes the default username
+EMAIL_RE = re.compile(r"^([^@\s]+)@[^@\s]+\.[^@\s]+$")
 
 
 @app.get("/")
 async def root():
-    return {
-        "message": "Auravisual Collab Manager API", 
-        "version": settings.project_version,
-        "status": "running",
-        "environment": settings.environment
-    }
+    return Response(ROOT_BODY, media_type="application/json")
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "auravisual-backend"}
+    return Response(HEALTH_BODY, media_type="application/json")
 
 # Public database health check (limited info)
 @app.get("/health/db")
@@ -58,24 +97,67 @@ async def database_health():
 
 # Protected user management endpoints
 @app.get("/admin/users")
-async def list_all_users(current_user: Dict = Depends(require_admin)):
-    """List all users (admin only)"""
-    users = await get_all_users()
-    return {
-        "total_users": len(users),
+async def list_all_users(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: Dict = Depends(require_admin)
+):
+    """
+    List all users, newest first; pass limit/cursor to page through them (admin only)
+    With a limit, follow next_cursor for further pages; /admin/users/stream
+    returns every user without holding them all in memory. total_users
+    is the number of all users on every page.
+    """
+    try:
+        total_users, users = await get_all_users(limit=limit, cursor=cursor)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching users: {str(e)}")
+    return cached_json_response(request, {
+        "total_users": total_users,
         "users": users,
+        "next_cursor": next_page_cursor(users, limit),
         "requested_by": current_user.get("username")
-    }
+    }, max_age=USER_LIST_MAX_AGE)
+
+@app.get("/admin/users/stream")
+async def stream_users(current_user: Dict = Depends(require_admin)):
+    """
+    Stream all users as newline-delimited JSON, newest first (admin only)
+    Fetched page by page, so memory use does not grow with the user count.
+    """
+    async def user_lines():
+        cursor = None
+        while True:
+            users = await get_users_page(STREAM_PAGE_SIZE, cursor)
+            for user in users:
+                yield orjson.dumps(jsonable_encoder(user)) + b"\n"
+            cursor = next_page_cursor(users, STREAM_PAGE_SIZE)
+            if not cursor:
+                break
+    
+    return StreamingResponse(user_lines(), media_type="application/x-ndjson")
+
+@app.get("/admin/users/by-role")
+async def list_users_by_role(request: Request, current_user: Dict = Depends(require_admin)):
+    """List all users split into admin, internal_staff and client buckets (admin only)"""
+    try:
+        grouped = await get_users_grouped_by_role()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching users: {str(e)}")
+    return cached_json_response(request, {
+        **{role: grouped.get(role, []) for role in USER_ROLES},
+        "requested_by": current_user.get("username")
+    }, max_age=USER_LIST_MAX_AGE)
 
 @app.get("/admin/users/clients")
-async def list_clients(current_user: Dict = Depends(require_admin_or_staff)):
+async def list_clients(request: Request, current_user: Dict = Depends(require_admin_or_staff)):
     """List all clients with project counts (admin/staff only)"""
     clients = await get_users_by_role_with_projects("client")
     
     # Format response to include project information
-    formatted_clients = []
-    for client in clients:
-        formatted_client = {
+    formatted_clients = [
+        {
             "id": client.get("id"),
             "email": client.get("email"),
             "username": client.get("username"),
@@ -85,21 +167,23 @@ async def list_clients(current_user: Dict = Depends(require_admin_or_staff)):
             "created_at": client.get("created_at"),
             "projects_count": client.get("projects_count", 0),
         }
-        formatted_clients.append(formatted_client)
+        for client in clients
+    ]
     
-    return {
+    return cached_json_response(request, {
         "total_clients": len(formatted_clients),
         "clients": formatted_clients,
         "requested_by": current_user.get("username")
-    }
+    }, max_age=USER_LIST_MAX_AGE)
 
 
 @app.get("/admin/dashboard")
-async def admin_dashboard(current_user: Dict = Depends(require_admin)):
+async def admin_dashboard(request: Request, current_user: Dict = Depends(require_admin)):
     """Get dashboard statistics (admin only)"""
     stats = await get_dashboard_stats()
     
-    return {
+    # ETag from the stats only, the timestamp changes on every call
+    return cached_json_response(request, {
         "dashboard": stats,
         "summary": {
             "total_active_projects": stats["projects"]["active"],
@@ -110,18 +194,17 @@ async def admin_dashboard(current_user: Dict = Depends(require_admin)):
         },
         "requested_by": current_user.get("username"),
         "timestamp": datetime.utcnow().isoformat()
-    }
+    }, max_age=DASHBOARD_MAX_AGE, etag_source=stats)
 
 
 @app.get("/admin/users/staff")
-async def list_internal_staff(current_user: Dict = Depends(require_admin)):
+async def list_internal_staff(request: Request, current_user: Dict = Depends(require_admin)):
     """List all internal staff with task statistics (admin only)"""
     staff = await get_users_by_role_with_tasks("internal_staff")
     
     # Format response to include only required fields
-    formatted_staff = []
-    for member in staff:
-        formatted_member = {
+    formatted_staff = [
+        {
             "id": member.get("id"),
             "email": member.get("email"),
             "username": member.get("username"),
@@ -131,12 +214,13 @@ async def list_internal_staff(current_user: Dict = Depends(require_admin)):
                 "active_tasks": 0
             })
         }
-        formatted_staff.append(formatted_member)
+        for member in staff
+    ]
     
-    return {
+    return cached_json_response(request, {
         "total_staff": len(formatted_staff),
         "staff": formatted_staff
-    }
+    }, max_age=USER_LIST_MAX_AGE)
 
 @app.post("/auth/register")
 async def register(user_data: dict, current_user: Dict = Depends(require_admin)):
@@ -153,17 +237,23 @@ async def register(user_data: dict, current_user: Dict = Depends(require_admin))
                 detail="Email, password and full_name required"
             )
         
+        email_match = EMAIL_RE.match(email)
+        if not email_match:
+            raise HTTPException(
+                status_code=400,
+                detail="Invalid email"
+            )
+        
         # Role validation
-        allowed_roles = ["admin", "internal_staff", "client"]
-        if role not in allowed_roles:
+        if role not in USER_ROLES:
             raise HTTPException(
                 status_code=400,
-                detail=f"Invalid role. Must be one of: {allowed_roles}"
+                detail=f"Invalid role. Must be one of: {list(USER_ROLES)}"
             )
         
         # Create auth user - USE ADMIN CLIENT (service key)
         admin_client = get_supabase_admin_client()
-        auth_response = admin_client.auth.sign_up({
+        auth_response = await run_in_threadpool(admin_client.auth.sign_up, {
             "email": email,
             "password": password
         })
@@ -173,7 +263,7 @@ async def register(user_data: dict, current_user: Dict = Depends(require_admin))
             profile_data = {
                 "id": auth_response.user.id,
                 "email": email,
-                "username": email.split("@")[0],
+                "username": email_match.group(1),
                 "full_name": full_name,
                 "role": role,
                 "is_active": True,
@@ -181,7 +271,13 @@ async def register(user_data: dict, current_user: Dict = Depends(require_admin))
             }
             
             # Insert profile - ALREADY USING ADMIN CLIENT
-            admin_client.from_("users").insert(profile_data).execute()
+            try:
+                await run_in_threadpool(admin_client.from_("users").insert(profile_data).execute)
+            except Exception:
+                # Remove the auth user again so a retry with the same email works
+                await run_in_threadpool(admin_client.auth.admin.delete_user, auth_response.user.id)
+                raise
+            invalidate_cached_reads()
             
             return {
                 "message": "User registered successfully",
@@ -196,6 +292,8 @@ async def register(user_data: dict, current_user: Dict = Depends(require_admin))
                 detail="Registration failed"
             )
             
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=400,
@@ -204,70 +302,12 @@ async def register(user_data: dict, current_user: Dict = Depends(require_admin))
 
 
 # PROJECTS API:
-@app.get("/admin/projects")
-async def admin_list_projects(current_user: Dict = Depends(require_admin)):
-    """List all projects with client and only open tickets + active tasks (admin only)."""
-    projects = await get_all_projects_with_relations()
-    formatted = []
-    for p in projects:
-        client = p.get("client") or {}
-        tickets = p.get("tickets") or []
-        
-        # Filter open tickets
-        open_tickets = []
-        open_tasks_count = 0
-        for t in tickets:
-            if t.get("status") in OPEN_TICKET_STATUSES:
-                tasks = t.get("tasks") or []
-                active_tasks = [task for task in tasks if task.get("status") == ACTIVE_TASK_STATUS]
-                t_copy = {
-                    "id": t.get("id"),
-                    "message": t.get("message"),
-                    "status": t.get("status"),
-                    "created_at": t.get("created_at"),
-                    "updated_at": t.get("updated_at"),
-                    "active_tasks": active_tasks,
-                    "active_tasks_count": len(active_tasks)
-                }
-                open_tasks_count += len(active_tasks)
-                open_tickets.append(t_copy)
-        
-        formatted.append({
-            "id": p.get("id"),
-            "name": p.get("name") or "Unnamed Project",  
-            "description": p.get("description") or "",   
-            "status": p.get("status"),
-            "plan": p.get("plan"),
-            "website": p.get("website_url") or "",
-            "socials": p.get("social_links") or [],        
-            "contract_subscription_date": p.get("contract_subscription_date"), 
-            "client": {
-                "id": client.get("id"),
-                "email": client.get("email") or "unknown@example.com",
-                "username": client.get("username") or "unknown",
-                "full_name": client.get("full_name") or "Unknown Client"
-            },
-            "open_tickets_count": len(open_tickets),
-            "open_tasks_count": open_tasks_count,
-            "open_tickets": open_tickets,
-            "created_at": p.get("created_at"),
-            "updated_at": p.get("updated_at")
-        })
-    
-    return {
-        "total_projects": len(formatted),
-        "projects": formatted,
-        "requested_by": current_user.get("username")
-    }
-
-@app.get("/admin/projects/{project_id}")
-async def admin_get_project(project_id: str, current_user: Dict = Depends(require_admin)):
-    """Get single project with client and only open tickets + active tasks (admin only)."""
-    p = await get_project_with_relations(project_id)
-    if not p:
-        raise HTTPException(status_code=404, detail="Project not found")
+def _format_admin_project(p: Dict) -> Dict:
+    """Project with client and only open tickets + active tasks, as listed to admins"""
     client = p.get("client") or {}
     tickets = p.get("tickets") or []
+    
+    # Filter open tickets
     open_tickets = []
     open_tasks_count = 0
     for t in tickets:
@@ -285,29 +325,75 @@ async def admin_get_project(project_id: str, current_user: Dict = Depends(requir
             }
             open_tasks_count += len(active_tasks)
             open_tickets.append(t_copy)
-    result = {
+    
+    return {
         "id": p.get("id"),
-        "name": p.get("name"),
-        "description": p.get("description"),
+        "name": p.get("name") or "Unnamed Project",  
+        "description": p.get("description") or "",   
         "status": p.get("status"),
         "plan": p.get("plan"),
-        "website": p.get("website_url"),
-        "socials": p.get("social_links"),
-        "contract_subscription_date": p.get("contract_subscription_date"),
+        "website": p.get("website_url") or "",
+        "socials": p.get("social_links") or [],        
+        "contract_subscription_date": p.get("contract_subscription_date"), 
         "client": {
             "id": client.get("id"),
-            "email": client.get("email"),
-            "username": client.get("username"),
-            "full_name": client.get("full_name")
+            "email": client.get("email") or "unknown@example.com",
+            "username": client.get("username") or "unknown",
+            "full_name": client.get("full_name") or "Unknown Client"
         },
         "open_tickets_count": len(open_tickets),
         "open_tasks_count": open_tasks_count,
         "open_tickets": open_tickets,
         "created_at": p.get("created_at"),
-        "updated_at": p.get("updated_at"),
+        "updated_at": p.get("updated_at")
+    }
+
+@app.get("/admin/projects")
+async def admin_list_projects(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: Dict = Depends(require_admin)
+):
+    """List all projects with client and only open tickets + active tasks (admin only)."""
+    projects = await get_all_projects_with_relations(limit, cursor)
+    formatted = [_format_admin_project(p) for p in projects]
+    
+    return {
+        "total_projects": len(formatted),
+        "projects": formatted,
+        "next_cursor": next_page_cursor(projects, limit),
+        "requested_by": current_user.get("username")
+    }
+
+@app.get("/admin/projects/stream")
+async def admin_stream_projects(current_user: Dict = Depends(require_admin)):
+    """
+    Stream all projects as newline-delimited JSON (admin only)
+    Same items as /admin/projects, fetched page by page so neither the
+    database response nor the serialized body is held in memory at once.
+    """
+    async def project_lines():
+        cursor = None
+        while True:
+            projects = await get_projects_page(STREAM_PAGE_SIZE, cursor)
+            for p in projects:
+                yield orjson.dumps(jsonable_encoder(_format_admin_project(p))) + b"\n"
+            cursor = next_page_cursor(projects, STREAM_PAGE_SIZE)
+            if not cursor:
+                break
+    
+    return StreamingResponse(project_lines(), media_type="application/x-ndjson")
+
+@app.get("/admin/projects/{project_id}")
+async def admin_get_project(project_id: str, current_user: Dict = Depends(require_admin)):
+    """Get single project with client and only open tickets + active tasks (admin only)."""
+    p = await get_project_with_relations(project_id)
+    if not p:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return {
+        **_format_admin_project(p),
         "requested_by": current_user.get("username")
     }
-    return result
 
 # PROFILE API
 
@@ -432,7 +518,7 @@ async def get_all_tasks(
         if assigned_to:
             query = query.eq("assigned_to", assigned_to)
         
-        response = query.order("created_at", desc=True).execute()
+        response = await run_in_threadpool(query.order("created_at", desc=True).execute)
         tasks = response.data if response.data else []
         
         return {
@@ -469,11 +555,10 @@ async def create_task_endpoint(
             )
         
         # Validate priority
-        valid_priorities = ["low", "medium", "high", "urgent"]
-        if priority not in valid_priorities:
+        if priority not in TASK_PRIORITIES:
             raise HTTPException(
                 status_code=400,
-                detail=f"Invalid priority. Must be one of: {valid_priorities}"
+                detail=f"Invalid priority. Must be one of: {list(TASK_PRIORITIES)}"
             )
         
         # Create task
@@ -550,7 +635,7 @@ async def create_project_endpoint(
             )
         
         # Create project using database function
-        result = create_project(
+        result = await create_project(
             name=name,
             client_id=client_id,
             website=website,
@@ -594,16 +679,18 @@ async def login(credentials: dict):
         
         # Use Supabase Auth to sign in
         client = get_supabase_client()
-        response = client.auth.sign_in_with_password({
+        response = await run_in_threadpool(client.auth.sign_in_with_password, {
             "email": email, 
             "password": password
         })
         
         if response.user and response.session:
-            # Get user profile - USE ADMIN CLIENT to bypass RLS
-            admin_client = get_supabase_admin_client()
-            profile_response = admin_client.from_("users").select("*").eq("id", response.user.id).single().execute()
-            user_profile = profile_response.data if profile_response.data else None
+            # Get user profile - service role key (rest_client) bypasses RLS
+            profiles, _ = await rest_select("users", "username, role, full_name", {
+                "id": f"eq.{response.user.id}",
+                "limit": "1"
+            })
+            user_profile = profiles[0] if profiles else {}
             
             return {
                 "access_token": response.session.access_token,
@@ -611,9 +698,9 @@ async def login(credentials: dict):
                 "user": {
                     "id": response.user.id,
                     "email": response.user.email,
-                    "username": user_profile.get("username") if user_profile else None,
-                    "role": user_profile.get("role") if user_profile else "client",
-                    "full_name": user_profile.get("full_name") if user_profile else None
+                    "username": user_profile.get("username"),
+                    "role": user_profile.get("role", "client"),
+                    "full_name": user_profile.get("full_name")
                 }
             }
         else:
@@ -622,6 +709,15 @@ async def login(credentials: dict):
                 detail="Invalid credentials"
             )
             
+    except HTTPException:
+        raise
+    except AuthApiError:
+        # Rejected by Supabase Auth (wrong email/password); a fixed message
+        # gives nothing away
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid credentials"
+        )
     except Exception as e:
         raise HTTPException(
             status_code=401,
@@ -629,11 +725,15 @@ async def login(credentials: dict):
         )
 
 @app.post("/auth/logout")
-async def logout(current_user: Dict = Depends(get_current_user)):
+async def logout(
+    current_user: Dict = Depends(get_current_user),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
     """Logout user"""
+    forget_token(credentials.credentials)
     try:
         client = get_supabase_client()
-        client.auth.sign_out()
+        await run_in_threadpool(client.auth.sign_out)
         return {"message": "Logged out successfully"}
     except Exception as e:
         return {"message": "Logout completed", "note": str(e)}
@@ -658,9 +758,8 @@ async def client_list_projects(current_user: Dict = Depends(get_current_user)):
     projects = await get_client_projects(client_id)
     
     # Format response
-    formatted_projects = []
-    for project in projects:
-        formatted_project = {
+    formatted_projects = [
+        {
             "id": project.get("id"),
             "name": project.get("name"),
             "description": project.get("description"),
@@ -674,7 +773,8 @@ async def client_list_projects(current_user: Dict = Depends(get_current_user)):
             "created_at": project.get("created_at"),
             "updated_at": project.get("updated_at")
         }
-        formatted_projects.append(formatted_project)
+        for project in projects
+    ]
     
     return {
         "total_projects": len(formatted_projects),
@@ -790,9 +890,9 @@ async def client_get_project(
         admin_client = get_supabase_admin_client()
         
         # Get project and verify ownership
-        project_response = admin_client.from_("projects").select("*").eq("id", project_id).eq("client_id", client_id).single().execute()
+        project_response = await run_in_threadpool(admin_client.from_("projects").select(PROJECT_COLUMNS).eq("id", project_id).eq("client_id", client_id).maybe_single().execute)
         
-        if not project_response.data:
+        if not project_response:
             raise HTTPException(status_code=404, detail="Project not found or access denied")
         
         project = project_response.data
@@ -891,21 +991,21 @@ async def client_get_ticket_tasks(
         admin_client = get_supabase_admin_client()
         
         # Verify project and ticket ownership
-        ticket_check = admin_client.from_("tickets").select("""
+        ticket_check = await run_in_threadpool(admin_client.from_("tickets").select("""
             id,
             project_id,
             client_id,
             message,
             status
-        """).eq("id", ticket_id).eq("project_id", project_id).eq("client_id", client_id).single().execute()
+        """).eq("id", ticket_id).eq("project_id", project_id).eq("client_id", client_id).maybe_single().execute)
         
-        if not ticket_check.data:
+        if not ticket_check:
             raise HTTPException(status_code=404, detail="Ticket not found or access denied")
         
         ticket_info = ticket_check.data
         
         # Get tasks for this ticket
-        tasks_response = admin_client.from_("tasks").select("""
+        tasks_response = await run_in_threadpool(admin_client.from_("tasks").select("""
             id,
             action,
             priority,
@@ -916,19 +1016,26 @@ async def client_get_ticket_tasks(
                 full_name,
                 username
             )
-        """).eq("ticket_id", ticket_id).order("created_at", desc=True).execute()
+        """).eq("ticket_id", ticket_id).order("created_at", desc=True).execute)
         
         tasks = tasks_response.data if tasks_response.data else []
         
-        # Format tasks for client view
+        # Format tasks for client view, counting statuses in the same pass
         formatted_tasks = []
+        completed_tasks = 0
+        active_tasks = 0
         for task in tasks:
             assigned_user = task.get("users") or {}
+            task_status = task.get("status")
+            if task_status == "completed":
+                completed_tasks += 1
+            elif task_status == "in_progress":
+                active_tasks += 1
             formatted_task = {
                 "id": task.get("id"),
                 "action": task.get("action"),
                 "priority": task.get("priority"),
-                "status": task.get("status"),
+                "status": task_status,
                 "assigned_to": {
                     "name": assigned_user.get("full_name") or "Staff Member",
                     "username": assigned_user.get("username") or "staff"
@@ -938,10 +1045,7 @@ async def client_get_ticket_tasks(
             }
             formatted_tasks.append(formatted_task)
         
-        # Calculate statistics
         total_tasks = len(formatted_tasks)
-        completed_tasks = len([t for t in formatted_tasks if t["status"] == "completed"])
-        active_tasks = len([t for t in formatted_tasks if t["status"] == "in_progress"])
         
         return {
             "ticket": {
@@ -1121,7 +1225,7 @@ async def get_my_time_summary(current_user: Dict = Depends(get_current_user)):
         admin_client = get_supabase_admin_client()
         
         # Get all tasks assigned to user with time data
-        tasks_response = admin_client.from_("tasks").select("""
+        tasks_response = await run_in_threadpool(admin_client.from_("tasks").select("""
             id,
             action,
             status,
@@ -1138,7 +1242,7 @@ async def get_my_time_summary(current_user: Dict = Depends(get_current_user)):
                     name
                 )
             )
-        """).eq("assigned_to", user_id).order("created_at", desc=True).execute()
+        """).eq("assigned_to", user_id).order("created_at", desc=True).execute)
         
         tasks = tasks_response.data if tasks_response.data else []
         
@@ -1275,32 +1379,40 @@ async def resume_task_timer_endpoint(
 
 # Debug endpoints (only in development and with admin access)
 if settings.debug:
+    # Settings are fixed for the life of the process, so snapshot them once
+    DEBUG_CONFIG = {
+        "environment": settings.environment,
+        "debug": settings.debug,
+        "cors_origins": list(settings.cors_origins),
+        "api_docs_enabled": bool(settings.docs_url),
+        "supabase_configured": bool(settings.supabase_key)
+    }
+    
     @app.get("/debug/config")
     async def debug_config(current_user: Dict = Depends(require_admin)):
         """Debug configuration (admin only, dev only)"""
-        return {
-            "environment": settings.environment,
-            "debug": settings.debug,
-            "cors_origins": settings.cors_origins,
-            "api_docs_enabled": bool(settings.docs_url),
-            "supabase_configured": bool(settings.supabase_key),
-            "accessed_by": current_user.get("username")
-        }
+        return {**DEBUG_CONFIG, "accessed_by": current_user.get("username")}
     
     @app.get("/debug/db")
-    async def debug_database(
-        current_user: Dict = Depends(require_admin),
-        db: Client = Depends(get_db)
-    ):
+    async def debug_database(current_user: Dict = Depends(require_admin)):
         """Debug database connection (admin only, dev only)"""
         try:
-            response = db.from_("users").select("*").limit(1).execute()
+            pool = await get_pool()
+            if pool:
+                # Direct Postgres connection when SUPABASE_DB_URL is set
+                async with pool.acquire() as conn:
+                    rows = await conn.fetch("select id from users limit 1")
+            else:
+                db = get_db()
+                response = await run_in_threadpool(db.from_("users").select("id").limit(1).execute)
+                rows = response.data
             return {
                 "status": "success",
                 "connection": "established",
+                "via": "postgres" if pool else "postgrest",
                 "table": "users",
-                "response_received": bool(response.data is not None),
-                "data_count": len(response.data) if response.data else 0,
+                "response_received": bool(rows is not None),
+                "data_count": len(rows) if rows else 0,
                 "accessed_by": current_user.get("username")
             }
         except Exception as e:
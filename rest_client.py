@@ -0,0 +1,76 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from config import settings, get_supabase_http_config
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Created on first use, closed with the other Supabase pools by
+# database.close_clients(). httpx cannot share a pool between sync and async
+# clients, so this is a separate pool with the same limits and timeouts.
+_client: Optional[httpx.AsyncClient] = None
+_client_lock = asyncio.Lock()
+
+async def get_rest_client() -> httpx.AsyncClient:
+    """
+    Get the shared async PostgREST client (service role key)
+    Reads issued here await the network directly instead of running the
+    synchronous supabase-py client in a worker thread.
+    """
+    global _client
+    if _client is not None:
+        return _client
+
+    async with _client_lock:
+        if _client is None:
+            key = settings.supabase_service_key
+            http_config = get_supabase_http_config()
+            _client = httpx.AsyncClient(
+                base_url=f"{settings.supabase_url}/rest/v1",
+                headers={"apikey": key, "Authorization": f"Bearer {key}"},
+                http2=True,
+                limits=httpx.Limits(
+                    max_connections=http_config["max_connections"],
+                    max_keepalive_connections=http_config["max_keepalive_connections"],
+                    keepalive_expiry=http_config["keepalive_expiry"]
+                ),
+                timeout=httpx.Timeout(http_config["timeout"], connect=http_config["connect_timeout"])
+            )
+            logger.info("Async PostgREST client initialized")
+    return _client
+
+async def close_rest_client() -> None:
+    """Close the client on shutdown"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+async def rest_select(
+    table: str,
+    columns: str,
+    params: Optional[Dict[str, str]] = None,
+    count: bool = False
+) -> Tuple[List[Dict], Optional[int]]:
+    """
+    GET rows from a table, e.g. params={"role": "eq.client"}
+    Returns (rows, total); with count=True the total number of matching
+    rows comes back in the same response (Content-Range), otherwise None.
+    """
+    client = await get_rest_client()
+    response = await client.get(
+        f"/{table}",
+        params={"select": columns.replace(" ", ""), **(params or {})},
+        headers={"Prefer": "count=exact"} if count else None
+    )
+    response.raise_for_status()
+
+    total = None
+    if count:
+        # e.g. "0-24/3573", or "*/0" when nothing matched
+        total = int(response.headers.get("content-range", "*/0").rsplit("/", 1)[1])
+    return response.json(), total
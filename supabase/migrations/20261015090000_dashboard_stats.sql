@@ -0,0 +1,20 @@
+-- Admin dashboard counters in a single round-trip.
+-- Called by database.get_dashboard_stats() through the service-role client.
+create or replace function public.dashboard_stats()
+returns json
+language sql
+stable
+set search_path = public
+as $$
+    select json_build_object(
+        'projects_total',  (select count(*) from projects),
+        'projects_active', (select count(*) from projects where status = 'in_development'),
+        'clients_total',   (select count(*) from users where role = 'client'),
+        'staff_total',     (select count(*) from users where role = 'internal_staff'),
+        'tickets_open',    (select count(*) from tickets where status in ('to_read', 'processing')),
+        'tasks_active',    (select count(*) from tasks where status = 'in_progress')
+    );
+$$;
+
+revoke execute on function public.dashboard_stats() from public, anon, authenticated;
+grant execute on function public.dashboard_stats() to service_role;
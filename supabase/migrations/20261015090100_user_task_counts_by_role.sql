@@ -0,0 +1,21 @@
+-- Per-user task counters for every user with the given role.
+-- Called by database.get_users_by_role_with_tasks() instead of two
+-- count queries per user.
+create or replace function public.user_task_counts_by_role(p_role text)
+returns table (user_id uuid, total_assigned integer, active_tasks integer)
+language sql
+stable
+set search_path = public
+as $$
+    select
+        t.assigned_to as user_id,
+        count(*)::integer as total_assigned,
+        (count(*) filter (where t.status = 'in_progress'))::integer as active_tasks
+    from tasks t
+    join users u on u.id = t.assigned_to
+    where u.role = p_role
+    group by t.assigned_to;
+$$;
+
+revoke execute on function public.user_task_counts_by_role(text) from public, anon, authenticated;
+grant execute on function public.user_task_counts_by_role(text) to service_role;
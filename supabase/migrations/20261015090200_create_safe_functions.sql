@@ -0,0 +1,126 @@
+-- Validate-and-insert helpers: one round-trip and one transaction instead of
+-- separate existence checks followed by an insert.
+-- Each returns the new row as JSON, or {"error": "..."} with the same messages
+-- database.py used to produce.
+--
+-- Values go through jsonb_populate_record so they are cast to the real column
+-- types (enums, jsonb, ...) exactly like a plain PostgREST insert would.
+
+create or replace function public.create_task_safe(
+    p_ticket_id uuid,
+    p_assigned_to uuid,
+    p_action text,
+    p_priority text default 'medium'
+)
+returns jsonb
+language plpgsql
+set search_path = public
+as $$
+declare
+    new_task tasks;
+begin
+    if not exists (select 1 from tickets where id = p_ticket_id) then
+        return jsonb_build_object('error', 'Ticket not found');
+    end if;
+
+    if not exists (select 1 from users where id = p_assigned_to) then
+        return jsonb_build_object('error', 'Assigned user not found');
+    end if;
+
+    insert into tasks (ticket_id, assigned_to, action, priority, status)
+    select r.ticket_id, r.assigned_to, r.action, r.priority, r.status
+    from jsonb_populate_record(null::tasks, jsonb_build_object(
+        'ticket_id', p_ticket_id,
+        'assigned_to', p_assigned_to,
+        'action', p_action,
+        'priority', p_priority,
+        'status', 'in_progress'
+    )) r
+    returning * into new_task;
+
+    return to_jsonb(new_task);
+end;
+$$;
+
+create or replace function public.create_ticket_safe(
+    p_project_id uuid,
+    p_client_id uuid,
+    p_message text
+)
+returns jsonb
+language plpgsql
+set search_path = public
+as $$
+declare
+    project_owner uuid;
+    new_ticket tickets;
+begin
+    select client_id into project_owner from projects where id = p_project_id;
+
+    if not found then
+        return jsonb_build_object('error', 'Project not found');
+    end if;
+
+    if project_owner is distinct from p_client_id then
+        return jsonb_build_object('error', 'You can only create tickets for your own projects');
+    end if;
+
+    insert into tickets (project_id, client_id, message, status)
+    select r.project_id, r.client_id, r.message, r.status
+    from jsonb_populate_record(null::tickets, jsonb_build_object(
+        'project_id', p_project_id,
+        'client_id', p_client_id,
+        'message', p_message,
+        'status', 'to_read'
+    )) r
+    returning * into new_ticket;
+
+    return to_jsonb(new_ticket);
+end;
+$$;
+
+create or replace function public.create_project_safe(
+    p_name text,
+    p_client_id uuid,
+    p_website text default null,
+    p_socials text default null
+)
+returns jsonb
+language plpgsql
+set search_path = public
+as $$
+declare
+    client_role text;
+    new_project projects;
+begin
+    select role::text into client_role from users where id = p_client_id;
+
+    if not found then
+        return jsonb_build_object('error', 'Client not found');
+    end if;
+
+    if client_role is distinct from 'client' then
+        return jsonb_build_object('error', 'Specified user is not a client');
+    end if;
+
+    insert into projects (name, client_id, status, website_url, social_links)
+    select r.name, r.client_id, r.status, r.website_url, r.social_links
+    from jsonb_populate_record(null::projects, jsonb_build_object(
+        'name', p_name,
+        'client_id', p_client_id,
+        'status', 'in_development',
+        'website_url', p_website,
+        'social_links', p_socials
+    )) r
+    returning * into new_project;
+
+    return to_jsonb(new_project);
+end;
+$$;
+
+revoke execute on function public.create_task_safe(uuid, uuid, text, text) from public, anon, authenticated;
+revoke execute on function public.create_ticket_safe(uuid, uuid, text) from public, anon, authenticated;
+revoke execute on function public.create_project_safe(text, uuid, text, text) from public, anon, authenticated;
+grant execute on function public.create_task_safe(uuid, uuid, text, text) to service_role;
+grant execute on function public.create_ticket_safe(uuid, uuid, text) to service_role;
+grant execute on function public.create_project_safe(text, uuid, text, text) to service_role;
@@ -0,0 +1,25 @@
+-- Indexes matching the filters used by database.py.
+-- Migrations run inside a transaction, so CONCURRENTLY cannot be used here;
+-- on a large production table create them manually with CONCURRENTLY first.
+
+-- get_tasks_by_user, get_user_task_counts, user_task_counts_by_role
+create index if not exists idx_tasks_assigned_to_status on tasks (assigned_to, status);
+
+-- tasks embedded under tickets, create_tasks_bulk
+create index if not exists idx_tasks_ticket_id on tasks (ticket_id);
+
+-- tickets embedded under projects, get_client_projects ticket counts
+create index if not exists idx_tickets_project_id_status on tickets (project_id, status);
+
+-- get_client_tickets (client_id, optionally project_id)
+create index if not exists idx_tickets_client_id_project_id on tickets (client_id, project_id);
+
+-- open tickets counter on the dashboard
+create index if not exists idx_tickets_open on tickets (project_id)
+    where status in ('to_read', 'processing');
+
+-- get_client_projects, client project counts
+create index if not exists idx_projects_client_id on projects (client_id);
+
+-- role listings and dashboard client/staff counters
+create index if not exists idx_users_role on users (role);
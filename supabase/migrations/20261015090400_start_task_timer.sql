@@ -0,0 +1,51 @@
+-- Start a work session on a task in one statement block.
+-- The task row is locked while the check and the append run, so two
+-- concurrent starts can no longer both pass the "already running" check or
+-- overwrite each other's time_logs. Called by database.start_task_timer().
+create or replace function public.start_task_timer(p_task_id uuid, p_user_id uuid)
+returns jsonb
+language plpgsql
+set search_path = public
+as $$
+declare
+    task_row tasks;
+    new_session jsonb;
+begin
+    select * into task_row from tasks where id = p_task_id for update;
+
+    if not found then
+        return jsonb_build_object('error', 'Task not found');
+    end if;
+
+    -- Assigned user or admin only
+    if task_row.assigned_to is distinct from p_user_id
+       and not exists (select 1 from users where id = p_user_id and role = 'admin') then
+        return jsonb_build_object('error', 'Permission denied');
+    end if;
+
+    -- A session without end_time is still running (or paused)
+    if exists (
+        select 1
+        from jsonb_array_elements(coalesce(task_row.time_logs, '[]'::jsonb)) as log
+        where coalesce(log ->> 'end_time', '') = ''
+    ) then
+        return jsonb_build_object('error', 'Task timer is already running');
+    end if;
+
+    -- Naive UTC ISO timestamp, same format as datetime.utcnow().isoformat()
+    new_session := jsonb_build_object(
+        'start_time', to_char(now() at time zone 'utc', 'YYYY-MM-DD"T"HH24:MI:SS.US'),
+        'started_by', p_user_id
+    );
+
+    update tasks
+    set time_logs = coalesce(time_logs, '[]'::jsonb) || jsonb_build_array(new_session),
+        status = 'in_progress'  -- Auto-start task when timer starts
+    where id = p_task_id;
+
+    return jsonb_build_object('session', new_session, 'task_id', p_task_id);
+end;
+$$;
+
+revoke execute on function public.start_task_timer(uuid, uuid) from public, anon, authenticated;
+grant execute on function public.start_task_timer(uuid, uuid) to service_role;
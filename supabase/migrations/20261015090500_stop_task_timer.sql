@@ -0,0 +1,90 @@
+-- Close the running (or paused) work session of a task and refresh its totals.
+-- Replaces the read-modify-write of time_logs in database.stop_task_timer():
+-- the row is locked, the session is closed with jsonb_set and the totals are
+-- recomputed in the same UPDATE.
+create or replace function public.stop_task_timer(p_task_id uuid, p_user_id uuid)
+returns jsonb
+language plpgsql
+set search_path = public
+as $$
+declare
+    task_row tasks;
+    logs jsonb;
+    session_index int;
+    session jsonb;
+    end_ts timestamp := now() at time zone 'utc';
+    start_ts timestamp;
+    duration int;
+    total_minutes int;
+    sessions_count int;
+begin
+    select * into task_row from tasks where id = p_task_id for update;
+
+    if not found then
+        return jsonb_build_object('error', 'Task not found');
+    end if;
+
+    -- Assigned user or admin only
+    if task_row.assigned_to is distinct from p_user_id
+       and not exists (select 1 from users where id = p_user_id and role = 'admin') then
+        return jsonb_build_object('error', 'Permission denied');
+    end if;
+
+    logs := coalesce(task_row.time_logs, '[]'::jsonb);
+
+    select (ord - 1)::int, log into session_index, session
+    from jsonb_array_elements(logs) with ordinality as t(log, ord)
+    where coalesce(log ->> 'end_time', '') = ''
+    order by ord
+    limit 1;
+
+    if session_index is null then
+        return jsonb_build_object('error', 'No active or paused timer found');
+    end if;
+
+    -- Timestamps are naive UTC ISO strings written by the timer helpers
+    start_ts := (session ->> 'start_time')::timestamp;
+
+    if coalesce(session ->> 'paused_at', '') <> '' and coalesce(session ->> 'resumed_at', '') <> '' then
+        -- Paused and resumed: exclude the pause
+        duration := trunc((
+            extract(epoch from end_ts - start_ts)
+            - extract(epoch from (session ->> 'resumed_at')::timestamp - (session ->> 'paused_at')::timestamp)
+        ) / 60);
+    elsif coalesce(session ->> 'paused_at', '') <> '' then
+        -- Currently paused: count up to the pause
+        duration := trunc(extract(epoch from (session ->> 'paused_at')::timestamp - start_ts) / 60);
+    else
+        duration := trunc(extract(epoch from end_ts - start_ts) / 60);
+    end if;
+
+    session := session || jsonb_build_object(
+        'end_time', to_char(end_ts, 'YYYY-MM-DD"T"HH24:MI:SS.US'),
+        'duration_minutes', duration,
+        'completion_note', '',
+        'completed_by', p_user_id
+    );
+    logs := jsonb_set(logs, array[session_index::text], session);
+
+    select coalesce(sum((log ->> 'duration_minutes')::numeric), 0)::int,
+           count(*) filter (where coalesce(log ->> 'end_time', '') <> '')
+    into total_minutes, sessions_count
+    from jsonb_array_elements(logs) as log;
+
+    update tasks
+    set time_logs = logs,
+        total_time_minutes = total_minutes,
+        time_sessions_count = sessions_count
+    where id = p_task_id;
+
+    return jsonb_build_object(
+        'session', session,
+        'task_id', p_task_id,
+        'total_time_minutes', total_minutes,
+        'sessions_count', sessions_count
+    );
+end;
+$$;
+
+revoke execute on function public.stop_task_timer(uuid, uuid) from public, anon, authenticated;
+grant execute on function public.stop_task_timer(uuid, uuid) to service_role;
@@ -0,0 +1,18 @@
+-- Task counters for a single user in one aggregate.
+-- Called by database.get_user_task_counts() instead of two count queries;
+-- served by idx_tasks_assigned_to_status.
+create or replace function public.user_task_counts(p_user_id uuid)
+returns table (total_assigned integer, active_tasks integer)
+language sql
+stable
+set search_path = public
+as $$
+    select
+        count(*)::integer as total_assigned,
+        (count(*) filter (where status = 'in_progress'))::integer as active_tasks
+    from tasks
+    where assigned_to = p_user_id;
+$$;
+
+revoke execute on function public.user_task_counts(uuid) from public, anon, authenticated;
+grant execute on function public.user_task_counts(uuid) to service_role;
@@ -0,0 +1,35 @@
+-- Evaluate auth.uid() / auth.jwt() / auth.role() once per statement in every
+-- RLS policy of the public schema.
+-- A bare auth.uid() in a policy is called for every row; wrapped in a
+-- scalar subquery, Postgres hoists it into an InitPlan and reuses the value.
+-- The policies live in the dashboard rather than in this repo, so they are
+-- rewritten from the catalog instead of being recreated by name. Calls that
+-- are already wrapped ("SELECT auth.uid() AS uid") are left untouched.
+do $$
+declare
+    pol record;
+    new_qual text;
+    new_check text;
+    stmt text;
+begin
+    for pol in
+        select schemaname, tablename, policyname, qual, with_check
+        from pg_policies
+        where schemaname = 'public'
+    loop
+        new_qual := regexp_replace(pol.qual, '(?<!SELECT )auth\.(uid|jwt|role)\(\)', '(select auth.\1())', 'g');
+        new_check := regexp_replace(pol.with_check, '(?<!SELECT )auth\.(uid|jwt|role)\(\)', '(select auth.\1())', 'g');
+
+        if new_qual is distinct from pol.qual or new_check is distinct from pol.with_check then
+            stmt := format('alter policy %I on %I.%I', pol.policyname, pol.schemaname, pol.tablename);
+            if new_qual is not null then
+                stmt := stmt || format(' using (%s)', new_qual);
+            end if;
+            if new_check is not null then
+                stmt := stmt || format(' with check (%s)', new_check);
+            end if;
+            execute stmt;
+        end if;
+    end loop;
+end;
+$$;
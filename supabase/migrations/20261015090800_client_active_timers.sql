@@ -0,0 +1,43 @@
+-- Running task timers across all projects of a client.
+-- Replaces the projects -> tickets -> tasks chain of IN queries in
+-- database.get_client_active_timers() and the Python scan of every task's
+-- time_logs: only the first open session of each task is returned.
+create or replace function public.client_active_timers(p_client_id uuid)
+returns jsonb
+language sql
+stable
+set search_path = public
+as $$
+    select jsonb_build_object(
+        'projects_checked', (select count(*) from projects where client_id = p_client_id),
+        'active_timers', coalesce((
+            select jsonb_agg(timers.timer)
+            from (
+                select distinct on (t.id)
+                    jsonb_build_object(
+                        'task_id', t.id,
+                        'task_action', t.action,
+                        'start_time', log ->> 'start_time',
+                        'session_id', log -> 'session_id',
+                        'user_id', log -> 'user_id',
+                        'user_name', coalesce(nullif(u.full_name, ''), nullif(u.username, ''), 'Staff Member'),
+                        'user_username', u.username,
+                        'project', jsonb_build_object('id', p.id, 'name', p.name),
+                        'ticket', jsonb_build_object('id', tk.id, 'message', tk.message)
+                    ) as timer
+                from projects p
+                join tickets tk on tk.project_id = p.id
+                join tasks t on t.ticket_id = tk.id
+                left join users u on u.id = t.assigned_to
+                cross join lateral jsonb_array_elements(coalesce(t.time_logs, '[]'::jsonb)) with ordinality as s(log, ord)
+                where p.client_id = p_client_id
+                  and log ->> 'end_time' is null
+                  and coalesce(log ->> 'start_time', '') <> ''
+                order by t.id, s.ord
+            ) as timers
+        ), '[]'::jsonb)
+    );
+$$;
+
+revoke execute on function public.client_active_timers(uuid) from public, anon, authenticated;
+grant execute on function public.client_active_timers(uuid) to service_role;
@@ -0,0 +1,121 @@
+-- Denormalized "timer running" flag on tasks.
+-- Whether a task has an open session (no end_time, running or paused) was
+-- found by expanding the whole time_logs array on every read. A trigger keeps
+-- has_active_timer in sync with time_logs so readers can check or filter on a
+-- plain boolean backed by a small partial index.
+alter table tasks add column if not exists has_active_timer boolean not null default false;
+
+create or replace function public.tasks_set_has_active_timer()
+returns trigger
+language plpgsql
+set search_path = public
+as $$
+begin
+    new.has_active_timer := exists (
+        select 1
+        from jsonb_array_elements(coalesce(new.time_logs, '[]'::jsonb)) as log
+        where coalesce(log ->> 'end_time', '') = ''
+    );
+    return new;
+end;
+$$;
+
+drop trigger if exists tasks_set_has_active_timer on tasks;
+create trigger tasks_set_has_active_timer
+    before insert or update of time_logs on tasks
+    for each row execute function public.tasks_set_has_active_timer();
+
+-- Backfill existing rows
+update tasks
+set has_active_timer = exists (
+    select 1
+    from jsonb_array_elements(coalesce(time_logs, '[]'::jsonb)) as log
+    where coalesce(log ->> 'end_time', '') = ''
+)
+where time_logs is not null;
+
+create index if not exists idx_tasks_has_active_timer on tasks (ticket_id) where has_active_timer;
+
+-- Trust the flag in the timer functions
+
+create or replace function public.start_task_timer(p_task_id uuid, p_user_id uuid)
+returns jsonb
+language plpgsql
+set search_path = public
+as $$
+declare
+    task_row tasks;
+    new_session jsonb;
+begin
+    select * into task_row from tasks where id = p_task_id for update;
+
+    if not found then
+        return jsonb_build_object('error', 'Task not found');
+    end if;
+
+    -- Assigned user or admin only
+    if task_row.assigned_to is distinct from p_user_id
+       and not exists (select 1 from users where id = p_user_id and role = 'admin') then
+        return jsonb_build_object('error', 'Permission denied');
+    end if;
+
+    -- A session without end_time is still running (or paused), tracked by
+    -- the tasks_set_has_active_timer trigger
+    if task_row.has_active_timer then
+        return jsonb_build_object('error', 'Task timer is already running');
+    end if;
+
+    -- Naive UTC ISO timestamp, same format as datetime.utcnow().isoformat()
+    new_session := jsonb_build_object(
+        'start_time', to_char(now() at time zone 'utc', 'YYYY-MM-DD"T"HH24:MI:SS.US'),
+        'started_by', p_user_id
+    );
+
+    update tasks
+    set time_logs = coalesce(time_logs, '[]'::jsonb) || jsonb_build_array(new_session),
+        status = 'in_progress'  -- Auto-start task when timer starts
+    where id = p_task_id;
+
+    return jsonb_build_object('session', new_session, 'task_id', p_task_id);
+end;
+$$;
+
+
+-- Only tasks flagged as running are expanded
+create or replace function public.client_active_timers(p_client_id uuid)
+returns jsonb
+language sql
+stable
+set search_path = public
+as $$
+    select jsonb_build_object(
+        'projects_checked', (select count(*) from projects where client_id = p_client_id),
+        'active_timers', coalesce((
+            select jsonb_agg(timers.timer)
+            from (
+                select distinct on (t.id)
+                    jsonb_build_object(
+                        'task_id', t.id,
+                        'task_action', t.action,
+                        'start_time', log ->> 'start_time',
+                        'session_id', log -> 'session_id',
+                        'user_id', log -> 'user_id',
+                        'user_name', coalesce(nullif(u.full_name, ''), nullif(u.username, ''), 'Staff Member'),
+                        'user_username', u.username,
+                        'project', jsonb_build_object('id', p.id, 'name', p.name),
+                        'ticket', jsonb_build_object('id', tk.id, 'message', tk.message)
+                    ) as timer
+                from projects p
+                join tickets tk on tk.project_id = p.id
+                join tasks t on t.ticket_id = tk.id
+                left join users u on u.id = t.assigned_to
+                cross join lateral jsonb_array_elements(coalesce(t.time_logs, '[]'::jsonb)) with ordinality as s(log, ord)
+                where p.client_id = p_client_id
+                  and t.has_active_timer
+                  and log ->> 'end_time' is null
+                  and coalesce(log ->> 'start_time', '') <> ''
+                order by t.id, s.ord
+            ) as timers
+        ), '[]'::jsonb)
+    );
+$$;
@@ -0,0 +1,116 @@
+-- Pause and resume a task's running session in place.
+-- Like stop_task_timer, the row is locked and only the affected element of
+-- time_logs is rewritten with jsonb_set, instead of database.py reading the
+-- whole array and writing it back.
+create or replace function public.pause_task_timer(p_task_id uuid, p_user_id uuid, p_note text default null)
+returns jsonb
+language plpgsql
+set search_path = public
+as $$
+declare
+    task_row tasks;
+    session_index int;
+    session jsonb;
+    pause_ts timestamp := now() at time zone 'utc';
+    duration int;
+begin
+    select * into task_row from tasks where id = p_task_id for update;
+
+    if not found then
+        return jsonb_build_object('error', 'Task not found');
+    end if;
+
+    -- Assigned user or admin only
+    if task_row.assigned_to is distinct from p_user_id
+       and not exists (select 1 from users where id = p_user_id and role = 'admin') then
+        return jsonb_build_object('error', 'Permission denied');
+    end if;
+
+    -- Running session: no end_time and not paused
+    select (ord - 1)::int, log into session_index, session
+    from jsonb_array_elements(coalesce(task_row.time_logs, '[]'::jsonb)) with ordinality as t(log, ord)
+    where coalesce(log ->> 'end_time', '') = ''
+      and coalesce(log ->> 'paused_at', '') = ''
+    order by ord
+    limit 1;
+
+    if session_index is null then
+        return jsonb_build_object('error', 'No active timer found');
+    end if;
+
+    -- Duration up to pause
+    duration := trunc(extract(epoch from pause_ts - (session ->> 'start_time')::timestamp) / 60);
+
+    session := session || jsonb_build_object(
+        'paused_at', to_char(pause_ts, 'YYYY-MM-DD"T"HH24:MI:SS.US'),
+        'duration_before_pause', duration,
+        'pause_note', coalesce(p_note, ''),
+        'paused_by', p_user_id
+    );
+
+    update tasks
+    set time_logs = jsonb_set(time_logs, array[session_index::text], session)
+    where id = p_task_id;
+
+    return jsonb_build_object(
+        'session', session,
+        'task_id', p_task_id,
+        'duration_before_pause', duration,
+        'status', 'paused'
+    );
+end;
+$$;
+
+create or replace function public.resume_task_timer(p_task_id uuid, p_user_id uuid, p_note text default null)
+returns jsonb
+language plpgsql
+set search_path = public
+as $$
+declare
+    task_row tasks;
+    session_index int;
+    session jsonb;
+begin
+    select * into task_row from tasks where id = p_task_id for update;
+
+    if not found then
+        return jsonb_build_object('error', 'Task not found');
+    end if;
+
+    -- Assigned user or admin only
+    if task_row.assigned_to is distinct from p_user_id
+       and not exists (select 1 from users where id = p_user_id and role = 'admin') then
+        return jsonb_build_object('error', 'Permission denied');
+    end if;
+
+    -- Paused session: paused_at set, no end_time
+    select (ord - 1)::int, log into session_index, session
+    from jsonb_array_elements(coalesce(task_row.time_logs, '[]'::jsonb)) with ordinality as t(log, ord)
+    where coalesce(log ->> 'paused_at', '') <> ''
+      and coalesce(log ->> 'end_time', '') = ''
+    order by ord
+    limit 1;
+
+    if session_index is null then
+        return jsonb_build_object('error', 'No paused timer found');
+    end if;
+
+    -- Remove paused_at to make it active again
+    session := (session - 'paused_at') || jsonb_build_object(
+        'resumed_at', to_char(now() at time zone 'utc', 'YYYY-MM-DD"T"HH24:MI:SS.US'),
+        'resume_note', coalesce(p_note, ''),
+        'resumed_by', p_user_id
+    );
+
+    update tasks
+    set time_logs = jsonb_set(time_logs, array[session_index::text], session)
+    where id = p_task_id;
+
+    return jsonb_build_object('session', session, 'task_id', p_task_id, 'status', 'active');
+end;
+$$;
+
+revoke execute on function public.pause_task_timer(uuid, uuid, text) from public, anon, authenticated;
+grant execute on function public.pause_task_timer(uuid, uuid, text) to service_role;
+revoke execute on function public.resume_task_timer(uuid, uuid, text) from public, anon, authenticated;
+grant execute on function public.resume_task_timer(uuid, uuid, text) to service_role;
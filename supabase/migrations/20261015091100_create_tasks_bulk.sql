@@ -0,0 +1,55 @@
+-- Insert a batch of tasks for a ticket and mark the ticket accepted in one
+-- transaction. Replaces the ticket check, assignee IN query, bulk insert and
+-- ticket update that database.create_tasks_bulk() sent as separate requests;
+-- a failure now rolls back the whole batch instead of leaving tasks on a
+-- ticket whose status was never updated.
+--
+-- p_tasks is a JSON array of {"assigned_to", "action", "priority"} objects,
+-- already validated for required fields and priority by the caller.
+create or replace function public.create_tasks_bulk(p_ticket_id uuid, p_tasks jsonb)
+returns jsonb
+language plpgsql
+set search_path = public
+as $$
+declare
+    missing_user text;
+    created jsonb;
+begin
+    perform 1 from tickets where id = p_ticket_id for update;
+
+    if not found then
+        return jsonb_build_object('error', 'Ticket not found');
+    end if;
+
+    -- First unknown assignee, in request order
+    select t.value ->> 'assigned_to' into missing_user
+    from jsonb_array_elements(p_tasks) with ordinality as t(value, ord)
+    where not exists (select 1 from users u where u.id = (t.value ->> 'assigned_to')::uuid)
+    order by t.ord
+    limit 1;
+
+    if missing_user is not null then
+        return jsonb_build_object('error', 'Assigned user not found: ' || missing_user);
+    end if;
+
+    with inserted as (
+        insert into tasks (ticket_id, assigned_to, action, priority, status)
+        select r.ticket_id, r.assigned_to, r.action, r.priority, r.status
+        from jsonb_array_elements(p_tasks) with ordinality as t(value, ord)
+        cross join lateral jsonb_populate_record(
+            null::tasks,
+            t.value || jsonb_build_object('ticket_id', p_ticket_id, 'status', 'in_progress')
+        ) r
+        order by t.ord
+        returning *
+    )
+    select coalesce(jsonb_agg(to_jsonb(inserted)), '[]'::jsonb) into created from inserted;
+
+    update tickets set status = 'accepted' where id = p_ticket_id;
+
+    return jsonb_build_object('tasks', created, 'ticket_id', p_ticket_id, 'ticket_status', 'accepted');
+end;
+$$;
+
+revoke execute on function public.create_tasks_bulk(uuid, jsonb) from public, anon, authenticated;
+grant execute on function public.create_tasks_bulk(uuid, jsonb) to service_role;
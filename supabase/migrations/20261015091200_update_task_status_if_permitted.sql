@@ -0,0 +1,38 @@
+-- Change a task's status only if the caller is its assignee or an admin.
+-- The permission check is part of the UPDATE's WHERE clause, so the common
+-- case is a single statement with no read-then-write window. The two
+-- lookups below only run to tell "not found" from "denied" after a miss.
+create or replace function public.update_task_status_if_permitted(
+    p_task_id uuid,
+    p_status text,
+    p_user_id uuid
+)
+returns jsonb
+language plpgsql
+set search_path = public
+as $$
+declare
+    updated tasks;
+begin
+    update tasks t
+    set status = r.status
+    from jsonb_populate_record(null::tasks, jsonb_build_object('status', p_status)) r
+    where t.id = p_task_id
+      and (t.assigned_to = p_user_id
+           or exists (select 1 from users where id = p_user_id and role = 'admin'))
+    returning t.* into updated;
+
+    if found then
+        return to_jsonb(updated);
+    end if;
+
+    if not exists (select 1 from tasks where id = p_task_id) then
+        return jsonb_build_object('error', 'Task not found');
+    end if;
+
+    return jsonb_build_object('error', 'Permission denied');
+end;
+$$;
+
+revoke execute on function public.update_task_status_if_permitted(uuid, text, uuid) from public, anon, authenticated;
+grant execute on function public.update_task_status_if_permitted(uuid, text, uuid) to service_role;
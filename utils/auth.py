@@ -1,18 +1,53 @@
 from fastapi import HTTPException, Depends, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from typing import Dict
-from database import get_supabase_client, get_supabase_admin_client, get_user_by_id
+from typing import Dict, Tuple
+from database import get_supabase_client, get_user_by_id
+import hashlib
+import jwt
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
 # Security scheme
 security = HTTPBearer()
 
+# Resolved profiles keyed on a hash of the bearer token, so repeat requests
+# with the same token skip the Supabase round trips. An entry never outlives
+# the token's exp claim, and logout drops it. Anything else is not seen
+# until the entry expires: a role or is_active change and a session revoked
+# elsewhere take up to TOKEN_CACHE_TTL seconds to apply, in each worker.
+TOKEN_CACHE_TTL = 60
+TOKEN_CACHE_MAXSIZE = 10_000
+_token_cache: Dict[bytes, Tuple[float, Dict]] = {}
+
+ADMIN_OR_STAFF_ROLES = frozenset(("admin", "internal_staff"))
+
+def _token_key(token: str) -> bytes:
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+def _token_cache_ttl(token: str) -> float:
+    """Seconds a verified token's profile may be cached: TOKEN_CACHE_TTL, capped at its exp"""
+    # Signature and expiry were just checked by Supabase; only exp is read here
+    exp = jwt.decode(token, options={"verify_signature": False}).get("exp")
+    if exp is None:
+        return TOKEN_CACHE_TTL
+    return min(TOKEN_CACHE_TTL, exp - time.time())
+
+def forget_token(token: str) -> None:
+    """Drop a token's cached profile (e.g. on logout)"""
+    _token_cache.pop(_token_key(token), None)
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict:
     """Get current authenticated user from Supabase token"""
     try:
         token = credentials.credentials
+        key = _token_key(token)
+        entry = _token_cache.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        
         logger.info(f"🔍 DEBUG: Received token: {token[:50]}...")
         
         # Use Supabase to verify the token
@@ -21,17 +56,15 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         logger.info("🔍 DEBUG: Using Supabase client to verify token")
         
         # Verify token with Supabase
-        response = client.auth.get_user(token)
+        response = await run_in_threadpool(client.auth.get_user, token)
         
         logger.info(f"🔍 DEBUG: Supabase response: {response.user is not None}")
         
         if response.user:
             # Get user profile from database using admin client
-            admin_client = get_supabase_admin_client()
-            profile_response = admin_client.from_("users").select("*").eq("id", response.user.id).single().execute()
+            user_profile = await get_user_by_id(response.user.id)
             
-            if profile_response.data:
-                user_profile = profile_response.data
+            if user_profile:
                 logger.info(f"🔍 DEBUG: User profile found: {user_profile.get('email')}")
                 
                 # Check if user is active
@@ -41,6 +74,13 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
                         detail="User account is disabled"
                     )
                 
+                ttl = _token_cache_ttl(token)
+                if ttl > 0:
+                    if key not in _token_cache and len(_token_cache) >= TOKEN_CACHE_MAXSIZE:
+                        # Evict the oldest insertion
+                        _token_cache.pop(next(iter(_token_cache)), None)
+                    _token_cache[key] = (time.monotonic() + ttl, user_profile)
+                
                 return user_profile
             else:
                 logger.error("🔍 DEBUG: User profile not found in database")
@@ -76,8 +116,7 @@ async def require_admin(current_user: Dict = Depends(get_current_user)) -> Dict:
 
 async def require_admin_or_staff(current_user: Dict = Depends(get_current_user)) -> Dict:
     """Require admin or internal_staff role"""
-    allowed_roles = ["admin", "internal_staff"]
-    if current_user.get("role") not in allowed_roles:
+    if current_user.get("role") not in ADMIN_OR_STAFF_ROLES:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin or staff access required"
@@ -0,0 +1,109 @@
+import asyncio
+import functools
+import time
+from typing import Any, Callable, Dict, Tuple
+
+
+class Uncached:
+    """
+    Wrapper for a value async_ttl_cache returns to the caller but does not store
+    Helpers return their error fallbacks (empty list, zero counters) wrapped
+    in it, so one failed query is not served as real data for the whole TTL.
+    """
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+
+def async_ttl_cache(ttl: float, maxsize: int = 256) -> Callable:
+    """
+    Cache the results of an async function for `ttl` seconds, keyed on its arguments.
+
+    Concurrent callers that miss on the same key share a single call to the
+    wrapped function (per-key asyncio.Lock), so a burst of requests hits the
+    database once. Cached values are shared between callers and must be
+    treated as read-only. Writers call `cache_clear()` on the wrapper to
+    invalidate; calls already running when it is called return their result
+    without storing it. Results wrapped in `Uncached` are unwrapped and not stored.
+    """
+    def decorator(func: Callable) -> Callable:
+        cache: Dict[Tuple, Tuple[float, Any]] = {}
+        locks: Dict[Tuple, asyncio.Lock] = {}
+        # Bumped by cache_clear(), so a call that started before a write
+        # does not store its (possibly stale) result after it
+        generation = 0
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+
+            entry = cache.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                return entry[1]
+
+            lock = locks.setdefault(key, asyncio.Lock())
+            try:
+                async with lock:
+                    # Another caller may have filled the entry while we waited
+                    entry = cache.get(key)
+                    if entry is not None and entry[0] > time.monotonic():
+                        return entry[1]
+
+                    started = generation
+                    result = await func(*args, **kwargs)
+                    if isinstance(result, Uncached):
+                        return result.value
+                    if generation != started:
+                        return result
+
+                    if key not in cache and len(cache) >= maxsize:
+                        # Evict the oldest insertion
+                        cache.pop(next(iter(cache)), None)
+                    cache[key] = (time.monotonic() + ttl, result)
+                    return result
+            finally:
+                # Locks only matter while a call is running; keys come from
+                # callers (e.g. cursors), so they must not pile up. Callers
+                # still queued on this lock find the entry once they get it.
+                if not lock.locked() and locks.get(key) is lock:
+                    del locks[key]
+
+        def cache_clear() -> None:
+            """Drop every cached entry, including results of calls still running"""
+            nonlocal generation
+            generation += 1
+            cache.clear()
+            locks.clear()
+
+        wrapper.cache_clear = cache_clear
+        return wrapper
+
+    return decorator
+
+
+def coalesce_calls(func: Callable) -> Callable:
+    """
+    Share one in-flight call of an async function between concurrent callers.
+
+    While a call for a given set of arguments is running, further callers
+    with the same arguments await that call instead of starting their own.
+    Nothing is kept once it finishes, so unlike async_ttl_cache every new
+    burst still reads fresh data.
+    """
+    inflight: Dict[Tuple, asyncio.Task] = {}
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        key = (args, tuple(sorted(kwargs.items())))
+
+        task = inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            inflight[key] = task
+            task.add_done_callback(lambda _: inflight.pop(key, None))
+
+        # A cancelled caller must not cancel the call the others are awaiting
+        return await asyncio.shield(task)
+
+    return wrapper
@@ -0,0 +1,40 @@
+import hashlib
+from typing import Any, Optional
+
+import orjson
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
+
+
+def compute_etag(data: Any) -> str:
+    """Weak ETag for JSON-serializable data (stable regardless of key order)"""
+    payload = orjson.dumps(jsonable_encoder(data), option=orjson.OPT_SORT_KEYS)
+    return f'W/"{hashlib.blake2s(payload).hexdigest()}"'
+
+
+def cached_json_response(
+    request: Request,
+    content: Any,
+    max_age: int,
+    etag_source: Optional[Any] = None
+) -> Response:
+    """
+    Return `content` with private Cache-Control and ETag headers.
+
+    The ETag is computed from `etag_source` when given (e.g. the data without a
+    per-request timestamp), otherwise from `content`. A matching If-None-Match
+    gets an empty 304 so the client reuses its copy.
+    """
+    etag = compute_etag(content if etag_source is None else etag_source)
+    headers = {
+        "Cache-Control": f"private, max-age={max_age}",
+        "ETag": etag
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+
+    return ORJSONResponse(content=jsonable_encoder(content), headers=headers)